@@ -0,0 +1,126 @@
+import heapq
+
+
+def shortest_path_dag(source, target, neighbors):
+    """
+    Returns the parents of every person on some shortest path from the
+    source to the target, or None if there is no path.
+
+    `neighbors` maps a person to its (movie_id, person_id) pairs. The
+    result maps each person to the list of (movie_id, parent_id) steps
+    that reach it from one level closer to the source. Its size is
+    bounded by the number of edges searched, however many paths there are.
+    """
+    depth = {source: 0}
+    parents = {source: []}
+    frontier = [source]
+    while frontier and target not in depth:
+        next_frontier = []
+        level = depth[frontier[0]] + 1
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors(person_id):
+                if neighbor_id not in depth:
+                    depth[neighbor_id] = level
+                    parents[neighbor_id] = []
+                    next_frontier.append(neighbor_id)
+                if depth[neighbor_id] == level:
+                    parents[neighbor_id].append((movie_id, person_id))
+        frontier = next_frontier
+
+    if target not in depth:
+        return None
+
+    # Keep only the people that lead to the target
+    dag = {}
+    stack = [target]
+    while stack:
+        person_id = stack.pop()
+        if person_id in dag:
+            continue
+        dag[person_id] = parents[person_id]
+        for _, parent_id in parents[person_id]:
+            stack.append(parent_id)
+    return dag
+
+
+def count_paths(dag, source, target):
+    """
+    Returns the number of shortest paths in `dag` without listing them.
+    """
+    counts = {}
+
+    def count(person_id):
+        if person_id == source:
+            return 1
+        if person_id not in counts:
+            counts[person_id] = sum(
+                count(parent_id) for _, parent_id in dag[person_id])
+        return counts[person_id]
+
+    # Paths are short, so the recursion stays shallow
+    return count(target)
+
+
+def enumerate_paths(dag, source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs in `dag`.
+
+    Paths are produced one at a time by a depth-first walk back from
+    the target, so memory stays proportional to the path length.
+    """
+    # Each stack entry is a person and the index of its next parent
+    stack = [(target, 0)]
+    steps = []
+    while stack:
+        person_id, i = stack[-1]
+        if person_id == source:
+            yield list(reversed(steps))
+            stack.pop()
+            if steps:
+                steps.pop()
+            continue
+        if i == len(dag[person_id]):
+            stack.pop()
+            if steps:
+                steps.pop()
+            continue
+        stack[-1] = (person_id, i + 1)
+        movie_id, parent_id = dag[person_id][i]
+        steps.append((movie_id, person_id))
+        stack.append((parent_id, 0))
+
+
+def best_paths(dag, source, target, k, cost):
+    """
+    Returns up to `k` shortest lists of (movie_id, person_id) pairs in
+    `dag` with the lowest total `cost(movie_id)`, lowest first.
+
+    Keeps at most `k` partial paths per person, so the work does not
+    depend on the total number of paths.
+    """
+    # Maps each person to its best (total, steps) pairs from the source,
+    # where steps is a linked list of (movie_id, person_id, rest)
+    best = {source: [(0, None)]}
+
+    def best_to(person_id):
+        if person_id in best:
+            return best[person_id]
+        candidates = []
+        for movie_id, parent_id in dag[person_id]:
+            movie_cost = cost(movie_id)
+            for total, steps in best_to(parent_id):
+                candidates.append(
+                    (total + movie_cost, (movie_id, person_id, steps)))
+        best[person_id] = heapq.nsmallest(
+            k, candidates, key=lambda candidate: candidate[0])
+        return best[person_id]
+
+    paths = []
+    for _, steps in best_to(target):
+        path = []
+        while steps is not None:
+            movie_id, person_id, steps = steps
+            path.append((movie_id, person_id))
+        path.reverse()
+        paths.append(path)
+    return paths
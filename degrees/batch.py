@@ -0,0 +1,147 @@
+"""
+Answers many degrees of separation queries in one run.
+
+Reads one query per line from a file or stdin, as a source and a target
+separated by a tab. Each may be an IMDB person id or an unambiguous name.
+Writes one JSON object per query to stdout, in completion order; the
+"index" field gives the query's line number.
+
+Usage: python batch.py [directory] [--input FILE] [--workers N]
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python batch.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", default="-",
+                        help="file of tab-separated queries, - for stdin")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--compact", action="store_true",
+                        help="load an integer-indexed graph to save memory")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the compact graph from a cached snapshot")
+    return parser.parse_args(argv)
+
+
+def read_queries(f):
+    """
+    Yields (index, source, target) for every non-blank line of `f`.
+    """
+    for index, line in enumerate(f):
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        source, _, target = line.partition("\t")
+        yield index, source.strip(), target.strip()
+
+
+def resolve(value):
+    """
+    Returns the person id for an id or a name, or None if there is
+    no such person or the name is ambiguous.
+    """
+    if degrees.person_exists(value):
+        return value
+    person_ids = degrees.person_ids_for_name(value)
+    if len(person_ids) == 1:
+        return person_ids[0]
+    return None
+
+
+def group_queries(queries):
+    """
+    Resolves queries and groups them by source.
+
+    Returns a dictionary mapping each source id to its list of
+    (index, target_id) pairs, and a list of results for the queries
+    whose people could not be found.
+    """
+    groups = {}
+    failures = []
+    for index, source, target in queries:
+        source_id = resolve(source)
+        target_id = resolve(target)
+        if source_id is None or target_id is None:
+            failures.append({
+                "index": index,
+                "source": source,
+                "target": target,
+                "error": "Person not found."
+            })
+            continue
+        groups.setdefault(source_id, []).append((index, target_id))
+    return groups, failures
+
+
+def answer_group(group):
+    """
+    Answers all queries that share a source with one search.
+
+    Returns a list of result dictionaries.
+    """
+    source, queries = group
+    paths = degrees.shortest_paths(source, {target for _, target in queries})
+    results = []
+    for index, target in queries:
+        path = paths[target]
+        results.append({
+            "index": index,
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        })
+    return results
+
+
+def init_worker(directory, compact, snapshot):
+    """
+    Loads the data in a worker process that did not inherit it.
+    """
+    if degrees.graph is None and not degrees.people:
+        degrees.load_data(directory, compact=compact, snapshot=snapshot)
+
+
+def answer_groups(groups, workers, initargs):
+    """
+    Yields the result lists for every group, spreading groups over
+    `workers` processes that share the loaded graph.
+    """
+    if workers <= 1:
+        yield from map(answer_group, groups.items())
+        return
+    chunksize = max(1, len(groups) // (workers * 16))
+    with multiprocessing.Pool(workers, init_worker, initargs) as pool:
+        yield from pool.imap_unordered(
+            answer_group, groups.items(), chunksize=chunksize)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    degrees.load_data(args.directory, compact=args.compact,
+                      snapshot=args.snapshot)
+
+    if args.input == "-":
+        groups, failures = group_queries(read_queries(sys.stdin))
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            groups, failures = group_queries(read_queries(f))
+
+    for result in failures:
+        print(json.dumps(result))
+    initargs = (args.directory, args.compact, args.snapshot)
+    for results in answer_groups(groups, args.workers, initargs):
+        for result in results:
+            print(json.dumps(result))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
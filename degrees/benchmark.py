@@ -0,0 +1,212 @@
+"""
+Benchmarks for the degrees search.
+
+Usage: python benchmark.py frontier [sizes...]
+       python benchmark.py dataset directory [--mode M] [--queries N]
+                                             [--output FILE]
+"""
+import argparse
+import datetime
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import degrees
+from util import Node, QueueFrontier, StackFrontier
+
+MODES = ("dicts", "compact", "snapshot")
+
+
+class ListStackFrontier():
+    """
+    The original list-backed frontier, kept for comparison.
+    """
+    def __init__(self):
+        self.frontier = []
+
+    def add(self, node):
+        self.frontier.append(node)
+
+    def contains_state(self, state):
+        return any(node.state == state for node in self.frontier)
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        node = self.frontier[-1]
+        self.frontier = self.frontier[:-1]
+        return node
+
+
+class ListQueueFrontier(ListStackFrontier):
+    def remove(self):
+        node = self.frontier[0]
+        self.frontier = self.frontier[1:]
+        return node
+
+
+def time_frontier(frontier_class, size, probes):
+    """
+    Returns the seconds taken to fill a frontier with `size` nodes,
+    run `probes` membership checks against it, and drain it.
+    """
+    start = time.perf_counter()
+    frontier = frontier_class()
+    for state in range(size):
+        frontier.add(Node(state, None, None))
+    for state in range(0, 2 * size, max(1, 2 * size // probes)):
+        frontier.contains_state(state)
+    while not frontier.empty():
+        frontier.remove()
+    return time.perf_counter() - start
+
+
+def benchmark_frontier(sizes, probes=100, limit=100000):
+    """
+    Prints timings for the deque and list frontiers at each size.
+
+    The list frontiers are quadratic, so they are skipped for sizes
+    above `limit`.
+    """
+    classes = [
+        ("QueueFrontier", QueueFrontier, None),
+        ("StackFrontier", StackFrontier, None),
+        ("ListQueueFrontier", ListQueueFrontier, limit),
+        ("ListStackFrontier", ListStackFrontier, limit),
+    ]
+    print(f"{'frontier':<20}{'size':>10}{'seconds':>12}")
+    for size in sizes:
+        for name, frontier_class, max_size in classes:
+            if max_size is not None and size > max_size:
+                print(f"{name:<20}{size:>10}{'skipped':>12}")
+                continue
+            seconds = time_frontier(frontier_class, size, probes)
+            print(f"{name:<20}{size:>10}{seconds:>12.4f}")
+
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident set size of this process.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    """
+    Returns the resident set size of this process now, where the
+    platform reports it, or None.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_dataset(directory, mode, queries, seed=0):
+    """
+    Loads `directory` in `mode` and times shortest_path between
+    `queries` random pairs of people.
+
+    Returns a dictionary of results. Peak memory covers the whole
+    process, so run one mode per process.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory, compact=mode == "compact",
+                      snapshot=mode == "snapshot")
+    load_seconds = time.perf_counter() - start
+    load_rss = peak_rss_bytes()
+    loaded_rss = current_rss_bytes()
+
+    if degrees.graph is not None:
+        person_ids = degrees.graph.person_ids
+    else:
+        person_ids = list(degrees.people)
+    rng = random.Random(seed)
+    latencies = []
+    connected = 0
+    for _ in range(queries):
+        source = person_ids[rng.randrange(len(person_ids))]
+        target = person_ids[rng.randrange(len(person_ids))]
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, bidirectional=True)
+        latencies.append(time.perf_counter() - start)
+        connected += path is not None
+
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "directory": directory,
+        "mode": mode,
+        "people": len(person_ids),
+        "load_seconds": load_seconds,
+        "load_peak_rss_bytes": load_rss,
+        "loaded_rss_bytes": loaded_rss,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "queries": queries,
+        "connected": connected,
+        "p50_seconds": percentile(latencies, 0.50) if latencies else None,
+        "p99_seconds": percentile(latencies, 0.99) if latencies else None,
+        "mean_seconds": statistics.fmean(latencies) if latencies else None,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python benchmark.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    frontier = commands.add_parser("frontier", help="time the frontiers")
+    frontier.add_argument("sizes", nargs="*", type=int)
+
+    dataset = commands.add_parser("dataset", help="time loading and search")
+    dataset.add_argument("directory")
+    dataset.add_argument("--mode", choices=MODES + ("all",), default="all")
+    dataset.add_argument("--queries", type=int, default=200)
+    dataset.add_argument("--seed", type=int, default=0)
+    dataset.add_argument("--output", default="benchmarks.jsonl",
+                         help="file that results are appended to")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.command == "frontier":
+        benchmark_frontier(args.sizes or [1000, 10000, 20000, 100000, 1000000])
+        return
+
+    if args.mode == "all":
+        # One process per mode, so peak memory is measured separately
+        for mode in MODES:
+            subprocess.run([
+                sys.executable, sys.argv[0], "dataset", args.directory,
+                "--mode", mode, "--queries", str(args.queries),
+                "--seed", str(args.seed), "--output", args.output,
+            ], check=True)
+        return
+
+    result = benchmark_dataset(args.directory, args.mode, args.queries,
+                               args.seed)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+    resident = result["loaded_rss_bytes"]
+    print(f"{args.mode:<10} load {result['load_seconds']:.2f}s, "
+          f"peak {result['peak_rss_bytes'] / 2 ** 20:.0f} MiB, "
+          f"resident {'?' if resident is None else resident // 2 ** 20} MiB, "
+          f"p50 {result['p50_seconds'] * 1000:.2f} ms, "
+          f"p99 {result['p99_seconds'] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
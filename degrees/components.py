@@ -0,0 +1,97 @@
+from array import array
+
+
+def find(parents, node):
+    """
+    Returns the root of `node`, halving the path to it on the way.
+    """
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+
+def label_components(count, groups):
+    """
+    Finds the connected components of `count` nodes numbered from 0,
+    where every node in each of `groups` is connected to the others.
+
+    Returns (labels, sizes): the component number of every node, and
+    the number of nodes in every component.
+    """
+    parents = array("i", range(count))
+    for group in groups:
+        iterator = iter(group)
+        first = next(iterator, None)
+        if first is None:
+            continue
+        root = find(parents, first)
+        for node in iterator:
+            other = find(parents, node)
+            if other != root:
+                parents[other] = root
+
+    # Number components densely in order of their first node
+    labels = array("i", bytes(4 * count))
+    sizes = array("q")
+    numbers = {}
+    for node in range(count):
+        root = find(parents, node)
+        if root not in numbers:
+            numbers[root] = len(sizes)
+            sizes.append(0)
+        labels[node] = numbers[root]
+        sizes[numbers[root]] += 1
+    return labels, sizes
+
+
+class Components():
+    """
+    Component sizes from label_components, kept up to date as
+    components are joined or new nodes get new labels.
+
+    Existing labels are never rewritten: labels of components joined
+    later point at each other through a union-find over labels.
+    """
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.count = len(sizes)
+        # Maps merged or new labels to their parent label
+        self.parents = {}
+        # Sizes of components that changed since labelling
+        self.changed_sizes = {}
+
+    def root(self, label):
+        while label in self.parents:
+            label = self.parents[label]
+        return label
+
+    def size(self, label):
+        root = self.root(label)
+        if root in self.changed_sizes:
+            return self.changed_sizes[root]
+        return self.sizes[root]
+
+    def new_label(self):
+        """
+        Returns a label for a new component of one node.
+        """
+        label = self.count
+        self.changed_sizes[label] = 1
+        self.count += 1
+        return label
+
+    def union(self, label, other):
+        """
+        Joins the components of two labels.
+        """
+        root, other = self.root(label), self.root(other)
+        if root == other:
+            return
+        size, other_size = self.size(root), self.size(other)
+        if size < other_size:
+            root, other = other, root
+        self.changed_sizes[root] = size + other_size
+        # Publish the merge last, so readers never see a partial one
+        self.parents[other] = root
@@ -1,7 +1,14 @@
-import csv
+import argparse
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from allpaths import best_paths, count_paths, enumerate_paths, shortest_path_dag
+from components import Components, label_components
+from graph import load_graph, read_rows
+from landmarks import astar_path, load_index
+from nameindex import NameIndex
+from snapshot import cached_graph
+from util import Node, StackFrontier, QueueFrontier, SearchStats, tree_path
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,76 +19,248 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the number of their connected component
+component_of = {}
 
-def load_data(directory):
+# Sizes of the connected components, and components joined since loading
+components = Components([])
+
+# Compact integer-indexed graph, used instead of the dicts above when loaded
+graph = None
+
+# Landmark distances over the graph, used to guide searches when loaded
+landmark_index = None
+
+# Prefix and fuzzy name lookup, built on first use
+name_index = None
+
+
+def load_data(directory, compact=False, snapshot=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is set, loads a Graph instead of the dicts.
+    If `snapshot` is set, maps the Graph from a binary snapshot of the
+    CSV files, building the snapshot first if it is missing or stale.
     """
+    global graph, components
+    if snapshot:
+        graph = cached_graph(directory)
+        return
+    if compact:
+        graph = load_graph(directory)
+        return
+
+    # Strings are interned, so repeated ids, names and years share one
+    # object between rows
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in read_rows(f"{directory}/people.csv"):
+        person_id = sys.intern(person_id)
+        name = sys.intern(name)
+        people[person_id] = {
+            "name": name,
+            "birth": sys.intern(birth),
+            "movies": set()
+        }
+        key = sys.intern(name.lower())
+        if key not in names:
+            names[key] = {person_id}
+        else:
+            names[key].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in read_rows(f"{directory}/movies.csv"):
+        movies[sys.intern(movie_id)] = {
+            "title": sys.intern(title),
+            "year": sys.intern(year),
+            "stars": set()
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for person_id, movie_id in read_rows(f"{directory}/stars.csv"):
+        person_id = sys.intern(person_id)
+        movie_id = sys.intern(movie_id)
+        try:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+        except KeyError:
+            pass
+
+    # Label connected components
+    person_ids = list(people)
+    index = {person_id: i for i, person_id in enumerate(person_ids)}
+    labels, sizes = label_components(
+        len(person_ids),
+        ([index[person_id] for person_id in movie["stars"]]
+         for movie in movies.values()))
+    for person_id, label in zip(person_ids, labels):
+        component_of[person_id] = label
+    components = Components(sizes)
+
+
+def add_rows(people_rows=(), movie_rows=(), star_rows=()):
+    """
+    Adds people, movies and stars to the loaded data, which can keep
+    answering queries meanwhile.
+
+    Rows have the layout of the CSV files: (id, name, birth) for people,
+    (id, title, year) for movies and (person_id, movie_id) for stars.
+    Components and the name index are updated in place. The landmark
+    index is dropped, as new stars can make its distances overestimate.
+    """
+    global landmark_index
+    landmark_index = None
+
+    if graph is not None:
+        graph.add_rows(people_rows, movie_rows, star_rows)
+    else:
+        for person_id, name, birth in people_rows:
+            add_person(person_id, name, birth)
+        for movie_id, title, year in movie_rows:
+            add_movie(movie_id, title, year)
+        for person_id, movie_id in star_rows:
+            add_star(person_id, movie_id)
+
+    if name_index is not None:
+        for _, name, _ in people_rows:
+            name_index.add(name.lower())
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person with no movies, unless the id is already known.
+    """
+    if person_id in people:
+        return
+    # Searches may run meanwhile, so index the person before publishing
+    # them in `people`, and replace sets rather than change them
+    component_of[person_id] = components.new_label()
+    people[person_id] = {
+        "name": name,
+        "birth": birth,
+        "movies": set()
+    }
+    names[name.lower()] = names.get(name.lower(), set()) | {person_id}
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie with no stars, unless the id is already known.
+    """
+    if movie_id in movies:
+        return
+    movies[movie_id] = {
+        "title": title,
+        "year": year,
+        "stars": set()
+    }
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie, joining their components.
+    Returns False if either id is unknown.
+    """
+    try:
+        person = people[person_id]
+        movie = movies[movie_id]
+    except KeyError:
+        return False
+    if person_id in movie["stars"]:
+        return True
+    costar_id = next(iter(movie["stars"]), None)
+    movie["stars"] = movie["stars"] | {person_id}
+    person["movies"] = person["movies"] | {movie_id}
+    if costar_id is not None:
+        components.union(component_of[person_id], component_of[costar_id])
+    return True
+
+
+def load_landmarks(directory):
+    """
+    Load the landmark index for the compact graph, if one was built.
+
+    Returns whether an up to date index was found.
+    """
+    global landmark_index
+    landmark_index = load_index(graph, directory)
+    return landmark_index is not None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python degrees.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", action="store_true",
+                        help="load an integer-indexed graph to save memory")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the compact graph from a cached snapshot")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="guide the search with the landmark index")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search statistics, except with --paths")
+    parser.add_argument("--paths", type=int, metavar="K",
+                        help="list up to K shortest paths, most recent movies first")
+    return parser.parse_args(argv)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = parse_args(sys.argv[1:])
+    directory = args.directory
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=args.compact,
+              snapshot=args.snapshot or args.landmarks)
     print("Data loaded.")
+    if args.landmarks and not load_landmarks(directory):
+        print("No landmark index, using breadth-first search.")
 
-    source = person_id_for_name(input("Name: "))
+    source = prompt_person()
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = prompt_person()
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.paths:
+        # One search builds the paths DAG, which gives the count and paths
+        found = path_dag(source, target)
+        if found[0] is None:
+            print("Not connected.")
+            return
+        paths = recent_shortest_paths(source, target, args.paths, found)
+        print(f"{len(paths[0])} degrees of separation, "
+              f"{count_shortest_paths(source, target, found)} shortest paths.")
+        for path in paths:
+            print()
+            print_path(source, path)
+        return
+
+    stats = SearchStats() if args.stats else None
+    path = shortest_path(source, target, bidirectional=args.bidirectional,
+                         stats=stats)
 
     if path is None:
         print("Not connected.")
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print(f"{len(path)} degrees of separation.")
+        print_path(source, path)
+
+    if stats is not None:
+        print(stats)
+
+
+def print_path(source, path):
+    degrees = len(path)
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = person_info(path[i][1])["name"]
+        person2 = person_info(path[i + 1][1])["name"]
+        movie = movie_info(path[i + 1][0])["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
 def create_path(node):
@@ -99,15 +278,163 @@ def create_path(node):
     #end run in here
     return list(zip(movies_ids, people_ids))
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
-    If no possible path, returns None.
+    If a landmark index is loaded, runs A* guided by it. Otherwise, if
+    `bidirectional` is set, searches from both ends at once.
+
+    If `stats` is a SearchStats, records what the search did in it.
+
+    If no possible path, returns None. A person is zero steps from
+    themselves, whatever the search.
+    """
+    if stats is not None:
+        start = time.perf_counter()
+
+    if source == target:
+        path = []
+    elif not connected(source, target):
+        path = None
+    else:
+        if graph is not None:
+            source = graph.person_index(source)
+            target = graph.person_index(target)
+            neighbors = graph.neighbors
+        else:
+            neighbors = neighbors_for_person
+
+        if landmark_index is not None:
+            path, _ = astar_path(graph, source, target, landmark_index, stats)
+        elif bidirectional:
+            path = bidirectional_path(source, target, neighbors, stats)
+        else:
+            path = breadth_first_path(source, target, neighbors, stats)
+        path = translate_path(path)
+
+    if stats is not None:
+        stats.wall_seconds = time.perf_counter() - start
+    return path
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list
+    of (movie_id, person_id) pairs that connect the source to it,
+    or to None if there is no possible path.
+
+    All targets share a single breadth-first search from the source.
+    """
+    paths = {target: None for target in targets}
+    targets = [target for target in targets if connected(source, target)]
+    if not targets:
+        return paths
+
+    if graph is None:
+        paths.update(breadth_first_paths(
+            source, targets, neighbors_for_person))
+        return paths
+
+    indexes = {graph.person_index(target): target for target in targets}
+    found = breadth_first_paths(
+        graph.person_index(source), indexes, graph.neighbors)
+    for target, path in found.items():
+        paths[indexes[target]] = translate_path(path)
+    return paths
+
+
+def path_dag(source, target):
+    """
+    Returns the parents of every person on a shortest path from the
+    source to the target, in the representation that is loaded.
+    """
+    if not connected(source, target):
+        return None, None, None
+    if graph is not None:
+        source = graph.person_index(source)
+        target = graph.person_index(target)
+        return shortest_path_dag(source, target, graph.neighbors), source, target
+    return shortest_path_dag(source, target, neighbors_for_person), source, target
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, one at a time.
+    """
+    dag, source, target = path_dag(source, target)
+    if dag is None:
+        return
+    for path in enumerate_paths(dag, source, target):
+        yield translate_path(path)
+
+
+def count_shortest_paths(source, target, found=None):
+    """
+    Returns the number of shortest paths between two people.
+
+    `found`, if given, is the result of path_dag for the two people,
+    so that one search can serve several queries.
+    """
+    dag, source, target = found or path_dag(source, target)
+    if dag is None:
+        return 0
+    return count_paths(dag, source, target)
+
+
+def ranked_shortest_paths(source, target, k, cost, found=None):
+    """
+    Returns up to `k` shortest lists of (movie_id, person_id) pairs that
+    connect the source to the target, with the lowest total
+    `cost(movie_id)` first. `found` is as for count_shortest_paths.
+    """
+    dag, source, target = found or path_dag(source, target)
+    if dag is None:
+        return []
+    if graph is not None:
+        movie_cost = cost
+        cost = lambda movie: movie_cost(graph.movie_ids[movie])
+    return [translate_path(path)
+            for path in best_paths(dag, source, target, k, cost)]
+
+
+def recent_shortest_paths(source, target, k, found=None):
+    """
+    Returns up to `k` shortest paths between two people, preferring
+    paths through recent movies. `found` is as for count_shortest_paths.
+    """
+    def age(movie_id):
+        year = movie_info(movie_id)["year"]
+        # Movies without a year rank as if very old
+        return -int(year) if year.isascii() and year.isdigit() else 0
+
+    return ranked_shortest_paths(source, target, k, age, found)
+
+
+def translate_path(path):
+    """
+    Maps a path of Graph indexes back to (movie_id, person_id) pairs.
+    """
+    if graph is None or path is None:
+        return path
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def breadth_first_path(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, or None.
+
+    `neighbors` maps a person to its (movie_id, person_id) pairs.
     """
     frontier = QueueFrontier()
     explored = set()
+    if stats is not None:
+        neighbors = stats.measure(
+            neighbors, lambda: (len(frontier.frontier), len(explored)))
 
     #create a tuple
 
@@ -122,24 +449,130 @@ def shortest_path(source, target):
         
         node = frontier.remove()
 
-        movie_options = people[node.state]["movies"]
-
         explored.add(node.state)
 
-        #change this loop with the function neighbors_for_person
-        for movie in movie_options:
-            for star in movies[movie]["stars"]:
+        for movie, star in neighbors(node.state):
+
+            if star == target:
+                child = Node(star, node, movie)
+                path = create_path(child)
+                #end run in here
+                return path
+
+            if not frontier.contains_state(star) and star not in explored:
+                child = Node(star, node, movie)
+                frontier.add(child)
 
-                if star == target:
-                    child = Node(star, node, movie)
-                    path = create_path(child)
-                    #end run in here
-                    return path
 
-                if not frontier.contains_state(star) and star not in explored:
-                    child = Node(star, node, movie)
-                    frontier.add(child)
 
+def breadth_first_paths(source, targets, neighbors, stats=None):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest list
+    of (movie_id, person_id) pairs from the source, or to None.
+
+    Searches level by level and stops as soon as every target is found.
+    """
+    remaining = set(targets)
+    paths = {target: None for target in remaining}
+    parents = {source: None}
+    if source in remaining:
+        paths[source] = []
+        remaining.discard(source)
+
+    frontier = [source]
+    next_frontier = []
+    if stats is not None:
+        neighbors = stats.measure(neighbors, lambda: (
+            len(frontier) + len(next_frontier), len(parents)))
+
+    while frontier and remaining:
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors(person_id):
+                if neighbor_id in parents:
+                    continue
+                parents[neighbor_id] = (movie_id, person_id)
+                next_frontier.append(neighbor_id)
+                if neighbor_id in remaining:
+                    paths[neighbor_id] = tree_path(neighbor_id, parents)
+                    remaining.discard(neighbor_id)
+                    if not remaining:
+                        return paths
+        frontier = next_frontier
+
+    return paths
+
+
+def bidirectional_path(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, or None.
+
+    Grows one search tree from each end, always expanding a whole
+    level of the smaller frontier, and joins the two trees at the
+    first person reached from both sides. `neighbors` maps a person
+    to its (movie_id, person_id) pairs.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) step
+    # leading back towards the root of its tree
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    if stats is not None:
+        neighbors = stats.measure(neighbors, lambda: (
+            len(forward_frontier) + len(backward_frontier),
+            len(forward) + len(backward)))
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors)
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors)
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def expand_level(frontier, parents, other_parents, neighbors):
+    """
+    Expands every person in `frontier` by one step, recording parents.
+
+    Returns the next frontier and the first person that the other tree
+    has already reached, or None if the trees have not met yet.
+    """
+    next_frontier = []
+    for person_id in frontier:
+        for movie_id, neighbor_id in neighbors(person_id):
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (movie_id, person_id)
+            if neighbor_id in other_parents:
+                return next_frontier, neighbor_id
+            next_frontier.append(neighbor_id)
+    return next_frontier, None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (movie_id, person_id) path from the root of `forward`
+    to the root of `backward` through the shared person `meeting`.
+    """
+    path = tree_path(meeting, forward)
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, parent_id = backward[person_id]
+        path.append((movie_id, parent_id))
+        person_id = parent_id
+
+    return path
 
 
 def person_id_for_name(name):
@@ -147,13 +580,13 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_info(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -168,11 +601,95 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def prompt_person():
+    """
+    Asks for a name until it matches a person, suggesting similar
+    names after a miss. Returns None if nothing similar exists.
+    """
+    while True:
+        name = input("Name: ")
+        person_id = person_id_for_name(name)
+        if person_id is not None:
+            return person_id
+        suggestions = suggest_names(name)
+        if not suggestions:
+            return None
+        print("Did you mean: " + ", ".join(suggestions) + "?")
+
+
+def get_name_index():
+    """
+    Returns the name index, building it on first use.
+    """
+    global name_index
+    if name_index is None:
+        if graph is not None:
+            name_index = NameIndex(name.lower() for name in graph.person_names)
+        else:
+            name_index = NameIndex(names)
+    return name_index
+
+
+def suggest_names(query, limit=10):
+    """
+    Returns up to `limit` names of people matching `query` by prefix
+    or with typos, best matches first.
+    """
+    suggestions = []
+    for name in get_name_index().search(query, limit):
+        person_id = person_ids_for_name(name)[0]
+        suggestions.append(person_info(person_id)["name"])
+    return suggestions
+
+
+def person_ids_for_name(name):
+    """
+    Returns the IMDB ids of every person with the given name.
+    """
+    if graph is not None:
+        return [graph.person_ids[person] for person in graph.people_named(name)]
+    return list(names.get(name.lower(), set()))
+
+
+def person_exists(person_id):
+    """
+    Returns whether `person_id` is a known IMDB id.
+    """
+    if graph is not None:
+        return graph.person_index(person_id) is not None
+    return person_id in people
+
+
+def connected(source, target):
+    """
+    Returns whether there is any path between two people.
+    """
+    if graph is not None:
+        return graph.connected(
+            graph.person_index(source), graph.person_index(target))
+    return (components.root(component_of[source])
+            == components.root(component_of[target]))
+
+
+def component_size(person_id):
+    """
+    Returns the number of people connected to a person,
+    including themselves.
+    """
+    if graph is not None:
+        return graph.component_size(graph.person_index(person_id))
+    return components.size(component_of[person_id])
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -181,5 +698,31 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def person_info(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        person = graph.person_index(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person]
+        }
+    return people[person_id]
+
+
+def movie_info(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        movie = graph.movie_index(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie]
+        }
+    return movies[movie_id]
+
+
 if __name__ == "__main__":
     main()
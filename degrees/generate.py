@@ -0,0 +1,108 @@
+"""
+Writes a synthetic IMDb-like dataset for benchmarking.
+
+Cast sizes follow a Pareto distribution and actors are picked with a
+power-law popularity, so a few people star in very many movies while
+most appear in one or two, as in the real data. Rows are written as
+they are generated, so any size fits in memory.
+
+Usage: python generate.py directory [--people N] [--movies N] [--seed S]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+
+SYLLABLES = [
+    "an", "ber", "car", "da", "el", "fi", "gor", "ha", "is", "jo",
+    "ka", "li", "mo", "na", "or", "pe", "qui", "ro", "sa", "ta",
+    "u", "vi", "wen", "xa", "yo", "ze",
+]
+WORDS = [
+    "Night", "Return", "Last", "City", "Love", "War", "Dark", "Star",
+    "Secret", "River", "Dream", "King", "Road", "Game", "Blood", "Summer",
+]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python generate.py")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--min-cast", type=int, default=3)
+    parser.add_argument("--cast-exponent", type=float, default=1.8,
+                        help="Pareto exponent of cast sizes")
+    parser.add_argument("--max-cast", type=int, default=200)
+    parser.add_argument("--popularity", type=float, default=2.5,
+                        help="skew of actor popularity, 1 for uniform")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def random_name(rng, parts):
+    return "".join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize()
+
+
+def generate(directory, people, movies, min_cast=3, cast_exponent=1.8,
+             max_cast=200, popularity=2.5, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv to `directory`.
+
+    Returns the number of star rows written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Pools of first and last names, small enough that some names repeat
+    first_names = [random_name(rng, rng.randint(1, 3))
+                   for _ in range(max(10, people // 200))]
+    last_names = [random_name(rng, rng.randint(2, 4))
+                  for _ in range(max(10, people // 20))]
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+            birth = rng.randint(1900, 2005) if rng.random() < 0.7 else ""
+            writer.writerow([person + 1, name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            writer.writerow([movie + 1, title, rng.randint(1920, 2024)])
+
+    stars = 0
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            cast = min(max_cast,
+                       int(min_cast * rng.paretovariate(cast_exponent)))
+            members = set()
+            for _ in range(cast):
+                # Low ids are the popular actors
+                members.add(int(people * rng.random() ** popularity) + 1)
+            for person_id in members:
+                writer.writerow([person_id, movie + 1])
+            stars += len(members)
+    return stars
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    stars = generate(args.directory, args.people, args.movies,
+                     args.min_cast, args.cast_exponent, args.max_cast,
+                     args.popularity, args.seed)
+    print(f"Wrote {args.people} people, {args.movies} movies "
+          f"and {stars} stars to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import bisect
+import csv
+import sys
+from array import array
+
+from components import Components, label_components
+
+
+class Table():
+    """
+    Read-only sequence followed by the values appended after loading.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.appended = []
+
+    def __len__(self):
+        return len(self.base) + len(self.appended)
+
+    def __getitem__(self, i):
+        if i < len(self.base):
+            return self.base[i]
+        return self.appended[i - len(self.base)]
+
+    def append(self, value):
+        self.appended.append(value)
+
+
+class Graph():
+    """
+    Compact person <-> movie graph.
+
+    People and movies are numbered densely in sorted id order, so an
+    original id maps to its index by binary search. Star relations are
+    stored once per direction in compressed sparse row form: the movies
+    of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`,
+    and likewise the stars of movie `m` in `movie_stars`.
+
+    People, movies and stars added after loading are kept beside the
+    arrays, which are never modified. Additions only ever append, and
+    each publishes its lookups last, so searches can run while they
+    are made.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_stars, name_order,
+                 component_labels, component_sizes):
+        self.person_ids = Table(person_ids)
+        self.person_names = Table(person_names)
+        self.person_births = Table(person_births)
+        self.movie_ids = Table(movie_ids)
+        self.movie_titles = Table(movie_titles)
+        self.movie_years = Table(movie_years)
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        # Person indexes sorted by lowercased name
+        self.name_order = name_order
+        # Connected component label of every person, and the sizes of
+        # the components when loaded
+        self.component_labels = Table(component_labels)
+        self.component_sizes = component_sizes
+        self.components = Components(component_sizes)
+
+        # Indexes of the people and movies in the arrays
+        self.loaded_people = len(person_ids)
+        self.loaded_movies = len(movie_ids)
+
+        # Lookups for what was added after loading
+        self.added_people = {}
+        self.added_movies = {}
+        self.added_names = {}
+        self.added_movies_of = {}
+        self.added_stars_of = {}
+
+    @property
+    def updated(self):
+        """
+        Whether anything was added after loading.
+        """
+        return bool(self.person_ids.appended or self.movie_ids.appended
+                    or self.added_stars_of)
+
+    def person_count(self):
+        return len(self.person_ids)
+
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the index of `person_id`, or None if it is unknown.
+        """
+        index = find_sorted(self.person_ids.base, person_id)
+        if index is None:
+            return self.added_people.get(person_id)
+        return index
+
+    def movie_index(self, movie_id):
+        """
+        Returns the index of `movie_id`, or None if it is unknown.
+        """
+        index = find_sorted(self.movie_ids.base, movie_id)
+        if index is None:
+            return self.added_movies.get(movie_id)
+        return index
+
+    def movies_of(self, person):
+        movies = []
+        if person < self.loaded_people:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]]
+        added = self.added_movies_of.get(person)
+        if added:
+            return list(movies) + added
+        return movies
+
+    def stars_of(self, movie):
+        stars = []
+        if movie < self.loaded_movies:
+            stars = self.movie_stars[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+        added = self.added_stars_of.get(movie)
+        if added:
+            return list(stars) + added
+        return stars
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with `person`.
+        """
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        added_stars = self.added_stars_of
+        pairs = []
+        if person < self.loaded_people:
+            for i in range(self.person_offsets[person],
+                           self.person_offsets[person + 1]):
+                movie = person_movies[i]
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    pairs.append((movie, movie_stars[j]))
+                if added_stars and movie in added_stars:
+                    for star in added_stars[movie]:
+                        pairs.append((movie, star))
+        for movie in self.added_movies_of.get(person, ()):
+            for star in self.stars_of(movie):
+                pairs.append((movie, star))
+        return pairs
+
+    def connected(self, person, other):
+        """
+        Returns whether there is any path between two people.
+        """
+        labels = self.component_labels
+        return (self.components.root(labels[person])
+                == self.components.root(labels[other]))
+
+    def component_size(self, person):
+        """
+        Returns the number of people `person` is connected to, including
+        themselves.
+        """
+        return self.components.size(self.component_labels[person])
+
+    def people_named(self, name):
+        """
+        Returns the indexes of all people whose name matches `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        names = self.person_names
+        order = self.name_order
+        start = bisect.bisect_left(
+            order, name, key=lambda person: names[person].lower())
+        matches = []
+        for i in range(start, len(order)):
+            if names[order[i]].lower() != name:
+                break
+            matches.append(order[i])
+        return matches + self.added_names.get(name, [])
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person with no movies, unless the id is already known.
+
+        Returns the index of the person.
+        """
+        index = self.person_index(person_id)
+        if index is not None:
+            return index
+        index = len(self.person_ids)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.component_labels.append(self.components.new_label())
+        self.person_ids.append(person_id)
+        self.added_people[person_id] = index
+        self.added_names.setdefault(name.lower(), []).append(index)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no stars, unless the id is already known.
+
+        Returns the index of the movie.
+        """
+        index = self.movie_index(movie_id)
+        if index is not None:
+            return index
+        index = len(self.movie_ids)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_ids.append(movie_id)
+        self.added_movies[movie_id] = index
+        return index
+
+    def add_star(self, person_id, movie_id):
+        """
+        Records that a person starred in a movie, joining their
+        components. Returns False if either id is unknown.
+        """
+        person = self.person_index(person_id)
+        movie = self.movie_index(movie_id)
+        if person is None or movie is None:
+            return False
+        stars = self.stars_of(movie)
+        if person in stars:
+            return True
+        self.added_stars_of.setdefault(movie, []).append(person)
+        self.added_movies_of.setdefault(person, []).append(movie)
+        if len(stars) > 0:
+            self.components.union(
+                self.component_labels[person], self.component_labels[stars[0]])
+        return True
+
+    def add_rows(self, people=(), movies=(), stars=()):
+        """
+        Adds rows in the same layout as the CSV files: (id, name, birth)
+        for people, (id, title, year) for movies and (person_id, movie_id)
+        for stars. Stars with unknown ids are skipped.
+        """
+        for person_id, name, birth in people:
+            self.add_person(person_id, name, birth)
+        for movie_id, title, year in movies:
+            self.add_movie(movie_id, title, year)
+        for person_id, movie_id in stars:
+            self.add_star(person_id, movie_id)
+
+
+def find_sorted(table, key):
+    """
+    Returns the position of `key` in the sorted sequence `table`,
+    or None if it is not there.
+    """
+    i = bisect.bisect_left(table, key)
+    if i < len(table) and table[i] == key:
+        return i
+    return None
+
+
+def read_rows(filename):
+    """
+    Yields the rows of a CSV file as tuples, skipping the header and
+    blank lines, as csv.DictReader does.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                yield tuple(row)
+
+
+class DigitStrings():
+    """
+    Read-only sequence of decimal strings without leading zeros, or empty
+    strings, stored as integers in an array with -1 for empty.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        return "" if value < 0 else str(value)
+
+
+class ColumnBuilder():
+    """
+    Collects one CSV column, as DigitStrings while every value fits and
+    as a list of interned strings otherwise.
+    """
+
+    def __init__(self, typecode):
+        self.values = array(typecode)
+        self.strings = None
+
+    def append(self, value):
+        if self.strings is None:
+            if value == "":
+                self.values.append(-1)
+                return
+            # isdigit alone accepts digits such as "²" that int rejects
+            if (value.isascii() and value.isdigit()
+                    and (value == "0" or value[0] != "0")):
+                try:
+                    self.values.append(int(value))
+                    return
+                except OverflowError:
+                    pass
+            self.strings = [sys.intern(str(number) if number >= 0 else "")
+                            for number in self.values]
+            self.values = None
+        self.strings.append(sys.intern(value))
+
+    def build(self, order):
+        """
+        Returns the column permuted into `order`.
+        """
+        if self.strings is not None:
+            return [self.strings[i] for i in order]
+        return DigitStrings(array(
+            self.values.typecode, (self.values[i] for i in order)))
+
+
+def load_table(filename, typecode):
+    """
+    Streams a people or movies CSV file into columns sorted by id.
+
+    Returns (ids, texts, years): ids and birth or release years as
+    compact columns, and names or titles as interned strings. Rows with
+    a repeated id replace the earlier ones.
+    """
+    ids = []
+    texts = []
+    years = ColumnBuilder("h")
+    for row_id, text, year in read_rows(filename):
+        ids.append(row_id)
+        texts.append(sys.intern(text))
+        years.append(year)
+
+    # Sort by id, keeping only the last row of every id
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    order = [i for n, i in enumerate(order)
+             if n + 1 == len(order) or ids[order[n + 1]] != ids[i]]
+
+    id_column = ColumnBuilder(typecode)
+    for i in order:
+        id_column.append(ids[i])
+    del ids
+    texts = [texts[i] for i in order]
+    return id_column.build(range(len(order))), texts, years.build(order)
+
+
+def compressed_rows(count, sources, targets, unique=False):
+    """
+    Groups the edges `sources[i] -> targets[i]` by source.
+
+    Returns (offsets, neighbors) arrays, where the neighbors of node `n`
+    are `neighbors[offsets[n]:offsets[n + 1]]`. If `unique` is set,
+    repeated edges are kept once and each row is sorted.
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    neighbors = array("i", bytes(4 * len(sources)))
+    position = array("q", offsets[:-1])
+    for source, target in zip(sources, targets):
+        neighbors[position[source]] = target
+        position[source] += 1
+
+    if unique:
+        # Compact the rows in place, left to right
+        end = 0
+        for i in range(count):
+            row = neighbors[offsets[i]:offsets[i + 1]]
+            if len(row) > 1:
+                row = array("i", sorted(set(row)))
+            offsets[i] = end
+            neighbors[end:end + len(row)] = row
+            end += len(row)
+        offsets[count] = end
+        del neighbors[end:]
+    return offsets, neighbors
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files into a compact Graph.
+    """
+    person_ids, person_names, person_births = load_table(
+        f"{directory}/people.csv", "q")
+    movie_ids, movie_titles, movie_years = load_table(
+        f"{directory}/movies.csv", "q")
+
+    # Translate star rows to index pairs, dropping unknown ids
+    person_lookup = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_lookup = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    star_people = array("i")
+    star_movies = array("i")
+    for person_id, movie_id in read_rows(f"{directory}/stars.csv"):
+        try:
+            person, movie = person_lookup[person_id], movie_lookup[movie_id]
+        except KeyError:
+            continue
+        star_people.append(person)
+        star_movies.append(movie)
+    del person_lookup, movie_lookup
+
+    # Repeated star rows are kept once, as sets do in dict mode, and the
+    # movie rows are built from the people's rows without repeats
+    person_offsets, person_movies = compressed_rows(
+        len(person_ids), star_people, star_movies, unique=True)
+    del star_movies
+    star_people = array("i", bytes(4 * len(person_movies)))
+    for person in range(len(person_ids)):
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            star_people[i] = person
+    movie_offsets, movie_stars = compressed_rows(
+        len(movie_ids), person_movies, star_people)
+
+    name_order = array("i", sorted(
+        range(len(person_ids)), key=lambda person: person_names[person].lower()))
+
+    component_labels, component_sizes = label_components(
+        len(person_ids),
+        (movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]
+         for movie in range(len(movie_ids))))
+
+    return Graph(person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_stars, name_order,
+                 component_labels, component_sizes)
@@ -0,0 +1,301 @@
+"""
+Landmark distance index for goal-directed search (ALT).
+
+Stores the degrees of separation from a few landmark people to everyone.
+By the triangle inequality, |d(L, target) - d(L, person)| is a lower bound
+on d(person, target), which A* uses to steer the search towards the target.
+
+Usage: python landmarks.py build [directory] [--count K] [--strategy S]
+       python landmarks.py query [directory] SOURCE TARGET
+"""
+import argparse
+import heapq
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+
+from snapshot import cached_graph, source_stats
+from util import tree_path
+
+MAGIC = b"DEGLMK01"
+FILENAME = "landmarks.index"
+STRATEGIES = ("degree", "farthest", "random")
+
+# Distance of people that a landmark cannot reach
+UNREACHABLE = -1
+
+
+class LandmarkIndex():
+    """
+    BFS distances from each landmark to every person in a Graph.
+
+    `distances[i][person]` is the number of degrees from landmark `i`
+    to `person`, or UNREACHABLE.
+    """
+
+    def __init__(self, landmarks, distances, strategy):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.strategy = strategy
+
+    def bound(self, target):
+        """
+        Returns a function giving a lower bound on the degrees from a
+        person to `target`, or None if the two cannot be connected.
+        """
+        pairs = [(row, row[target]) for row in self.distances]
+
+        def lower_bound(person):
+            best = 0
+            for row, target_distance in pairs:
+                distance = row[person]
+                if (distance == UNREACHABLE) != (target_distance == UNREACHABLE):
+                    return None
+                if abs(target_distance - distance) > best:
+                    best = abs(target_distance - distance)
+            return best
+
+        return lower_bound
+
+
+def bfs_distances(graph, source):
+    """
+    Returns an array of the degrees of separation from `source`
+    to every person in `graph`, including stars added after loading.
+    """
+    movies_of = graph.movies_of
+    stars_of = graph.stars_of
+
+    distances = array("h", [UNREACHABLE]) * graph.person_count()
+    seen_movies = bytearray(graph.movie_count())
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in stars_of(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        next_frontier.append(star)
+        frontier = next_frontier
+    return distances
+
+
+def costar_counts(graph):
+    """
+    Returns, for every person, the total cast size of their movies.
+    """
+    counts = array("q", bytes(8 * graph.person_count()))
+    for person in range(graph.person_count()):
+        total = 0
+        for movie in graph.movies_of(person):
+            total += len(graph.stars_of(movie))
+        counts[person] = total
+    return counts
+
+
+def build_index(graph, count=16, strategy="degree", seed=0):
+    """
+    Chooses `count` landmarks and returns their LandmarkIndex.
+
+    Strategies:
+      degree    the people with the largest total cast size
+      farthest  starts from the best connected person, then repeatedly
+                adds the person farthest from the landmarks chosen so far
+      random    a seeded random sample of people with at least one movie
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown landmark strategy: {strategy}")
+    counts = costar_counts(graph)
+    count = min(count, sum(1 for total in counts if total > 0))
+
+    if strategy == "degree":
+        landmarks = sorted(range(len(counts)), key=counts.__getitem__,
+                           reverse=True)[:count]
+        distances = [bfs_distances(graph, landmark) for landmark in landmarks]
+
+    elif strategy == "random":
+        candidates = [person for person, total in enumerate(counts) if total > 0]
+        landmarks = random.Random(seed).sample(candidates, count)
+        distances = [bfs_distances(graph, landmark) for landmark in landmarks]
+
+    else:
+        landmarks = [max(range(len(counts)), key=counts.__getitem__)]
+        distances = [bfs_distances(graph, landmarks[0])]
+        nearest = array("h", distances[0])
+        while len(landmarks) < count:
+            farthest = max(range(len(nearest)), key=nearest.__getitem__)
+            if nearest[farthest] <= 0:
+                break
+            landmarks.append(farthest)
+            distances.append(bfs_distances(graph, farthest))
+            for person, distance in enumerate(distances[-1]):
+                if distance != UNREACHABLE and distance < nearest[person]:
+                    nearest[person] = distance
+
+    return LandmarkIndex(landmarks, distances, strategy)
+
+
+def save_index(index, graph, directory):
+    """
+    Writes `index` to the landmark index file in `directory`.
+    """
+    header = json.dumps({
+        "sources": source_stats(directory),
+        "strategy": index.strategy,
+        "landmarks": [graph.person_ids[person] for person in index.landmarks],
+        "people": graph.person_count(),
+    }).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    filename = os.path.join(directory, FILENAME)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for row in index.distances:
+            array("h", row).tofile(f)
+    os.replace(temporary, filename)
+
+
+def load_index(graph, directory):
+    """
+    Maps the landmark index file in `directory` into memory.
+
+    Returns None if there is no index or it is out of date.
+    """
+    filename = os.path.join(directory, FILENAME)
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+    start = len(MAGIC) + 8
+    (length,) = struct.unpack("<Q", data[len(MAGIC):start])
+    header = json.loads(data[start:start + length])
+    if (header["sources"] != source_stats(directory)
+            or header["people"] != graph.person_count()):
+        return None
+
+    view = memoryview(data)[start + length:].cast("h")
+    size = graph.person_count()
+    landmarks = [graph.person_index(person_id)
+                 for person_id in header["landmarks"]]
+    distances = [view[i * size:(i + 1) * size]
+                 for i in range(len(landmarks))]
+    return LandmarkIndex(landmarks, distances, header["strategy"])
+
+
+def astar_path(graph, source, target, index=None, stats=None):
+    """
+    Returns (path, expanded): the shortest list of (movie, person) index
+    pairs from the source to the target, or None if there is no path,
+    and the number of people expanded to find it.
+
+    Without an index the lower bound is zero everywhere, so the search
+    expands people in plain breadth-first order.
+
+    If `stats` is a SearchStats, records what the search did in it.
+    """
+    if index is None:
+        def lower_bound(person):
+            return 0
+    else:
+        lower_bound = index.bound(target)
+        if lower_bound(source) is None:
+            return None, 0
+
+    parents = {source: None}
+    costs = {source: 0}
+    closed = set()
+    # Ties on the estimate are broken towards deeper people
+    heap = [(lower_bound(source), 0, source)]
+    expanded = 0
+    neighbors = graph.neighbors
+    if stats is not None:
+        neighbors = stats.measure(neighbors, lambda: (len(heap), len(closed)))
+    while heap:
+        _, negative_cost, person = heapq.heappop(heap)
+        if person == target:
+            return tree_path(person, parents), expanded
+        if person in closed:
+            continue
+        closed.add(person)
+        expanded += 1
+
+        cost = 1 - negative_cost
+        for movie, star in neighbors(person):
+            if star in closed or costs.get(star, cost + 1) <= cost:
+                continue
+            bound = lower_bound(star)
+            if bound is None:
+                continue
+            costs[star] = cost
+            parents[star] = (movie, person)
+            heapq.heappush(heap, (cost + bound, -cost, star))
+
+    return None, expanded
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python landmarks.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build and save an index")
+    build.add_argument("directory", nargs="?", default="large")
+    build.add_argument("--count", type=int, default=16)
+    build.add_argument("--strategy", choices=STRATEGIES, default="degree")
+    build.add_argument("--seed", type=int, default=0)
+
+    query = commands.add_parser("query", help="compare A* against BFS")
+    query.add_argument("directory", nargs="?", default="large")
+    query.add_argument("source")
+    query.add_argument("target")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    graph = cached_graph(args.directory)
+
+    if args.command == "build":
+        index = build_index(graph, args.count, args.strategy, args.seed)
+        save_index(index, graph, args.directory)
+        print(f"Saved {len(index.landmarks)} landmarks ({index.strategy}).")
+        return
+
+    people = []
+    for name in (args.source, args.target):
+        matches = graph.people_named(name)
+        if len(matches) != 1:
+            sys.exit(f"'{name}' does not name exactly one person.")
+        people.append(matches[0])
+
+    index = load_index(graph, args.directory)
+    if index is None:
+        print("No landmark index, run 'python landmarks.py build' first.")
+    path, expanded = astar_path(graph, *people, index)
+    _, bfs_expanded = astar_path(graph, *people)
+    if path is None:
+        print("Not connected.")
+    else:
+        print(f"{len(path)} degrees of separation.")
+    print(f"Expanded {expanded} people with landmarks, {bfs_expanded} without.")
+
+
+if __name__ == "__main__":
+    main()
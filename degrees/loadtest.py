@@ -0,0 +1,106 @@
+"""
+Load test for server.py on localhost.
+
+Sends /path requests between random people of a dataset over several
+keep-alive connections at once, and reports throughput and latency.
+
+Usage: python loadtest.py directory [--port PORT] [--requests N]
+                                    [--concurrency C]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from graph import read_rows
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python loadtest.py")
+    parser.add_argument("directory", help="dataset the server has loaded")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pairs", type=int, default=0,
+                        help="distinct pairs to draw from, 0 for no repeats")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+async def fetch(reader, writer, host, target):
+    """
+    Sends one GET request on an open connection and returns the status
+    and decoded JSON body.
+    """
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, queue, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            source, target = queue.get_nowait()
+            start = time.perf_counter()
+            status, _ = await fetch(
+                reader, writer, host, f"/path?source={source}&target={target}")
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(args, pairs):
+    queue = asyncio.Queue()
+    for pair in pairs:
+        queue.put_nowait(pair)
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(args.host, args.port, queue, latencies, statuses)
+        for _ in range(args.concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    person_ids = [row[0] for row in read_rows(f"{args.directory}/people.csv")]
+    rng = random.Random(args.seed)
+
+    def pair():
+        return rng.choice(person_ids), rng.choice(person_ids)
+
+    if args.pairs:
+        pool = [pair() for _ in range(args.pairs)]
+        pairs = [rng.choice(pool) for _ in range(args.requests)]
+    else:
+        pairs = [pair() for _ in range(args.requests)]
+
+    seconds, latencies, statuses = asyncio.run(run(args, pairs))
+    latencies.sort()
+    print(f"{len(latencies)} requests in {seconds:.2f}s "
+          f"({len(latencies) / seconds:.0f} requests/s)")
+    print(f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, "
+          f"mean {statistics.fmean(latencies) * 1000:.2f} ms")
+    print("Statuses: " + ", ".join(
+        f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
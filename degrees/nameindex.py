@@ -0,0 +1,135 @@
+import bisect
+import heapq
+from array import array
+from collections import Counter
+
+# Most characters a fuzzy match may differ in length from the query, one
+# for a single inserted or deleted character
+LENGTH_SLACK = 1
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup over a set of lowercased names.
+
+    Prefix matches come from a binary search over the sorted names.
+    Fuzzy matches come from an inverted index of character trigrams,
+    kept separately for every name length: only names about as long as
+    the query and only its rarest trigrams are looked up, which keeps
+    the number of candidates small, and candidates are then ranked by
+    how many trigrams they share with the query.
+
+    Postings refer to positions in `entries`, which only grows, so
+    names can be added while searches run.
+    """
+
+    def __init__(self, names, scan_budget=5000, length_slack=LENGTH_SLACK):
+        self.names = sorted(set(names))
+        self.entries = list(self.names)
+        # Most posting entries read by one fuzzy search
+        self.scan_budget = scan_budget
+        self.length_slack = length_slack
+
+        postings = {}
+        for i, name in enumerate(self.entries):
+            for gram in trigrams(name):
+                key = (gram, len(name))
+                if key not in postings:
+                    postings[key] = array("i")
+                postings[key].append(i)
+        self.postings = postings
+
+    def add(self, name):
+        """
+        Adds a lowercased name, unless it is already indexed.
+        """
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return
+        entry = len(self.entries)
+        self.entries.append(name)
+        for gram in trigrams(name):
+            self.postings.setdefault((gram, len(name)), array("i")).append(
+                entry)
+        self.names.insert(i, name)
+
+    def prefix(self, query, limit=10):
+        """
+        Returns up to `limit` names starting with `query`,
+        shortest first among the first `scan_budget` matches.
+        """
+        query = query.lower()
+        start = bisect.bisect_left(self.names, query)
+        stop = min(len(self.names), start + self.scan_budget)
+        matches = []
+        for i in range(start, stop):
+            if not self.names[i].startswith(query):
+                break
+            matches.append(self.names[i])
+        return heapq.nsmallest(limit, matches, key=len)
+
+    def fuzzy(self, query, limit=10):
+        """
+        Returns up to `limit` names most similar to `query`,
+        most similar first.
+        """
+        query = query.lower()
+        grams = trigrams(query)
+        lengths = range(max(1, len(query) - self.length_slack),
+                        len(query) + self.length_slack + 1)
+        lists = []
+        for gram in grams:
+            gram_lists = [self.postings[gram, length] for length in lengths
+                          if (gram, length) in self.postings]
+            if gram_lists:
+                lists.append((sum(map(len, gram_lists)), gram_lists))
+        lists.sort(key=lambda pair: pair[0])
+
+        # Count shared trigrams, reading the rarest trigrams first and
+        # never more than `scan_budget` entries. A trigram is read whole
+        # or not at all, since part of it would favour names early in
+        # the alphabet
+        counts = Counter()
+        scanned = 0
+        for size, gram_lists in lists:
+            if scanned + size > self.scan_budget:
+                break
+            scanned += size
+            for postings in gram_lists:
+                counts.update(postings)
+
+        candidates = [entry for entry, _ in counts.most_common(limit * 3)]
+        scored = []
+        for entry in candidates:
+            name = self.entries[entry]
+            scored.append((similarity(grams, trigrams(name)), name))
+        scored.sort(key=lambda pair: (-pair[0], len(pair[1]), pair[1]))
+        return [name for _, name in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` names for `query`: exact and prefix
+        matches first, then fuzzy matches.
+        """
+        matches = self.prefix(query, limit)
+        if len(matches) < limit:
+            seen = set(matches)
+            for name in self.fuzzy(query, limit):
+                if name not in seen and len(matches) < limit:
+                    matches.append(name)
+        return matches
+
+
+def trigrams(name):
+    """
+    Returns the set of character trigrams of a padded name.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(grams, other):
+    """
+    Returns the Dice coefficient of two trigram sets.
+    """
+    return 2 * len(grams & other) / (len(grams) + len(other))
@@ -0,0 +1,237 @@
+"""
+Local HTTP/JSON service answering degrees queries from a warm graph.
+
+Endpoints:
+  GET /path?source=ID&target=ID   shortest path between two people
+  GET /neighbors?person=ID        (movie_id, person_id) pairs of co-stars
+  GET /names?q=TEXT[&limit=N]     people matching a name, prefix or typo
+
+Searches run in a pool of worker processes that share the loaded graph,
+and their results are kept in an LRU cache.
+
+Usage: python server.py [directory] [--port PORT] [--workers N]
+"""
+import argparse
+import asyncio
+import functools
+import json
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import init_worker
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed"}
+
+
+class LRUCache():
+    """
+    Mapping that keeps only the `capacity` most recently used entries.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Service():
+    """
+    Answers requests against the data loaded in the degrees module.
+    """
+
+    def __init__(self, executor, cache_size=10000):
+        self.executor = executor
+        self.cache = LRUCache(cache_size)
+
+    async def handle(self, path, query):
+        if path == "/path":
+            return await self.path(person_param(query, "source"),
+                                   person_param(query, "target"))
+        if path == "/neighbors":
+            person_id = person_param(query, "person")
+            return {"person": person_id, "neighbors": sorted(
+                degrees.neighbors_for_person(person_id))}
+        if path == "/names":
+            return {"people": find_people(
+                param(query, "q"), int(query.get("limit", ["10"])[0]))}
+        raise HTTPError(404, "Unknown endpoint.")
+
+    async def path(self, source, target):
+        key = (source, target)
+        path = self.cache.get(key, key)
+        if path is key:
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(
+                self.executor, functools.partial(
+                    degrees.shortest_path, source, target,
+                    bidirectional=True))
+            self.cache.put(key, path)
+        return {
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        }
+
+
+def param(query, name):
+    if name not in query:
+        raise HTTPError(400, f"Missing parameter '{name}'.")
+    return query[name][0]
+
+
+def person_param(query, name):
+    person_id = param(query, name)
+    if not degrees.person_exists(person_id):
+        raise HTTPError(404, f"Person '{person_id}' not found.")
+    return person_id
+
+
+def find_people(text, limit):
+    """
+    Returns id, name and birth of people matching `text`, best first.
+    """
+    people = []
+    for name in degrees.get_name_index().search(text, limit):
+        for person_id in degrees.person_ids_for_name(name):
+            person = degrees.person_info(person_id)
+            people.append({"id": person_id, "name": person["name"],
+                           "birth": person["birth"]})
+    return people[:limit]
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP request. Returns (method, target, headers),
+    or None if the client closed the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length:
+        await reader.readexactly(length)
+    return method, target, headers
+
+
+def write_response(writer, status, body, keep_alive):
+    payload = json.dumps(body).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n".encode("latin-1") + payload)
+
+
+async def serve_connection(service, reader, writer):
+    """
+    Answers requests on one connection until the client is done.
+    """
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                break
+            if request is None:
+                break
+            method, target, headers = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+
+            url = urlsplit(target)
+            try:
+                if method != "GET":
+                    raise HTTPError(405, "Only GET is supported.")
+                status, body = 200, await service.handle(
+                    url.path, parse_qs(url.query))
+            except HTTPError as e:
+                status, body = e.status, {"error": str(e)}
+            except ValueError as e:
+                status, body = 400, {"error": str(e)}
+
+            write_response(writer, status, body, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python server.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--compact", action="store_true",
+                        help="load an integer-indexed graph to save memory")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the compact graph from a cached snapshot")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    initargs = (args.directory, args.compact, args.snapshot)
+    with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                             initargs=initargs) as executor:
+        service = Service(executor, args.cache_size)
+        server = await asyncio.start_server(
+            lambda reader, writer: serve_connection(service, reader, writer),
+            args.host, args.port)
+        print(f"Serving on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact,
+                      snapshot=args.snapshot)
+    degrees.get_name_index()
+    print("Data loaded.")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graph import Graph, load_graph
+
+MAGIC = b"DEGSNAP2"
+FILENAME = "graph.snapshot"
+JOURNAL = "graph.journal"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Graph attributes stored as arrays, with their typecodes
+ARRAYS = {
+    "person_offsets": "q",
+    "person_movies": "i",
+    "movie_offsets": "q",
+    "movie_stars": "i",
+    "name_order": "i",
+    "component_labels": "i",
+    "component_sizes": "q",
+}
+
+# Graph attributes stored as string tables
+STRINGS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed into one UTF-8 buffer.
+
+    String `i` is `blob[offsets[i]:offsets[i + 1]]`, decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def source_stats(directory):
+    """
+    Returns the (mtime, size) of every CSV file the snapshot is built from.
+    """
+    stats = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def pack_strings(strings):
+    """
+    Returns (offsets, blob) for a sequence of strings.
+    """
+    offsets = array("q", [0])
+    chunks = []
+    for string in strings:
+        chunk = string.encode("utf-8")
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return offsets, b"".join(chunks)
+
+
+def save_snapshot(graph, directory):
+    """
+    Writes `graph` to the snapshot file in `directory`.
+
+    Only graphs loaded from CSV files can be written, not ones with
+    additions, which are journaled instead.
+    """
+    if graph.updated:
+        raise ValueError("cannot snapshot a graph with additions")
+    sections = {}
+    for name, typecode in ARRAYS.items():
+        sections[name] = array(typecode, getattr(graph, name))
+    for name in STRINGS:
+        offsets, blob = pack_strings(getattr(graph, name))
+        sections[f"{name}.offsets"] = offsets
+        sections[f"{name}.blob"] = array("B", blob)
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, section in sections.items():
+        size = len(section) * section.itemsize
+        layout[name] = [section.typecode, position, len(section)]
+        position += size + (-size % 8)
+    header = json.dumps({
+        "sources": source_stats(directory),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    filename = os.path.join(directory, FILENAME)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for section in sections.values():
+            size = len(section) * section.itemsize
+            section.tofile(f)
+            f.write(bytes(-size % 8))
+    os.replace(temporary, filename)
+
+    # Rows journaled against an older snapshot are now included
+    try:
+        os.remove(os.path.join(directory, JOURNAL))
+    except FileNotFoundError:
+        pass
+
+
+def read_header(directory):
+    """
+    Maps the snapshot file in `directory` and parses its header.
+
+    Returns (data, header, body) where `body` is the offset of the
+    first section, or None if there is no valid snapshot file.
+    """
+    filename = os.path.join(directory, FILENAME)
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+    start = len(MAGIC) + 8
+    (length,) = struct.unpack("<Q", data[len(MAGIC):start])
+    header = json.loads(data[start:start + length])
+    return data, header, start + length
+
+
+def read_journal(directory):
+    """
+    Returns (base, entries) from the journal in `directory`: the source
+    stats of the snapshot it extends, and its entries in order. Each
+    entry holds the people, movies and stars rows appended to the CSV
+    files and the source stats after appending them.
+
+    Returns (None, []) if there is no journal.
+    """
+    try:
+        with open(os.path.join(directory, JOURNAL), encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return None, []
+    if not lines:
+        return None, []
+    return lines[0]["base"], lines[1:]
+
+
+def append_journal(directory, before, after, people=(), movies=(), stars=()):
+    """
+    Records rows that were appended to the CSV files, changing their
+    stats from `before` to `after`, so that the snapshot stays usable.
+
+    Returns False, recording nothing, if the snapshot and its journal
+    did not match `before`; the snapshot is then rebuilt on next load.
+    """
+    loaded = read_header(directory)
+    if loaded is None:
+        return False
+    sources = loaded[1]["sources"]
+    base, entries = read_journal(directory)
+    extends = len(entries) > 0 and base == sources
+    if (entries[-1]["sources"] if extends else sources) != before:
+        return False
+
+    with open(os.path.join(directory, JOURNAL), "a" if extends else "w",
+              encoding="utf-8") as f:
+        if not extends:
+            f.write(json.dumps({"base": sources}) + "\n")
+        f.write(json.dumps({
+            "people": [list(row) for row in people],
+            "movies": [list(row) for row in movies],
+            "stars": [list(row) for row in stars],
+            "sources": after,
+        }) + "\n")
+    return True
+
+
+def load_snapshot(directory):
+    """
+    Maps the snapshot file in `directory` into memory.
+
+    Returns a Graph whose arrays are views of the mapped file, with the
+    rows of the journal added, or None if there is no snapshot or the
+    CSV files have changed in a way the journal does not account for.
+    """
+    loaded = read_header(directory)
+    if loaded is None:
+        return None
+    data, header, body = loaded
+
+    # Replay the journal if rows were appended since the snapshot
+    current = source_stats(directory)
+    entries = []
+    if header["sources"] != current:
+        base, entries = read_journal(directory)
+        if (base != header["sources"] or not entries
+                or entries[-1]["sources"] != current):
+            return None
+
+    view = memoryview(data)
+    sections = {}
+    for name, (typecode, offset, count) in header["sections"].items():
+        size = count * array(typecode).itemsize
+        sections[name] = view[body + offset:body + offset + size].cast(typecode)
+
+    fields = {name: sections[name] for name in ARRAYS}
+    for name in STRINGS:
+        fields[name] = StringTable(
+            sections[f"{name}.offsets"], sections[f"{name}.blob"])
+    graph = Graph(**fields)
+    for entry in entries:
+        graph.add_rows(entry["people"], entry["movies"], entry["stars"])
+    return graph
+
+
+def cached_graph(directory):
+    """
+    Returns the Graph for `directory`, loading it from the snapshot file
+    when it is up to date and rebuilding the snapshot otherwise.
+    """
+    graph = load_snapshot(directory)
+    if graph is None:
+        graph = load_graph(directory)
+        save_snapshot(graph, directory)
+    return graph
@@ -0,0 +1,75 @@
+"""
+Appends people, movies and stars to a dataset.
+
+Each input file is a CSV file with the same header as the dataset file
+it is appended to. If the dataset has an up to date snapshot, the rows
+are also journaled next to it, so the next load maps the snapshot and
+adds them instead of rebuilding it from the CSV files.
+
+Usage: python update.py directory [--people FILE] [--movies FILE]
+                                  [--stars FILE]
+"""
+import argparse
+import csv
+import os
+import sys
+
+from graph import read_rows
+from snapshot import append_journal, source_stats
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python update.py")
+    parser.add_argument("directory")
+    parser.add_argument("--people", help="CSV file of id,name,birth rows")
+    parser.add_argument("--movies", help="CSV file of id,title,year rows")
+    parser.add_argument("--stars", help="CSV file of person_id,movie_id rows")
+    return parser.parse_args(argv)
+
+
+def append_rows(filename, rows):
+    """
+    Appends rows to a CSV file, which may lack a final newline.
+    """
+    missing_newline = False
+    with open(filename, "rb") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            missing_newline = f.read(1) != b"\n"
+    with open(filename, "a", encoding="utf-8", newline="") as f:
+        if missing_newline:
+            f.write("\n")
+        csv.writer(f, lineterminator="\n").writerows(rows)
+
+
+def update(directory, people=(), movies=(), stars=()):
+    """
+    Appends rows to the CSV files in `directory` and journals them
+    for its snapshot.
+
+    Returns whether the snapshot journal was updated.
+    """
+    before = source_stats(directory)
+    for filename, rows in (("people.csv", people), ("movies.csv", movies),
+                           ("stars.csv", stars)):
+        if rows:
+            append_rows(os.path.join(directory, filename), rows)
+    after = source_stats(directory)
+    return append_journal(directory, before, after, people, movies, stars)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    people = list(read_rows(args.people)) if args.people else []
+    movies = list(read_rows(args.movies)) if args.movies else []
+    stars = list(read_rows(args.stars)) if args.stars else []
+
+    journaled = update(args.directory, people, movies, stars)
+    print(f"Added {len(people)} people, {len(movies)} movies "
+          f"and {len(stars)} stars.")
+    if not journaled:
+        print("No up to date snapshot, it will be rebuilt on the next load.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import time
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -5,15 +9,66 @@ class Node():
         self.action = action
 
 
+class SearchStats():
+    """
+    Counters filled in by a search that is passed one as `stats`.
+
+    Searches only touch it through the neighbors function returned by
+    `measure`, so a search run without stats does no extra work.
+    """
+    def __init__(self):
+        self.expanded = 0
+        self.relaxed = 0
+        self.peak_frontier = 0
+        self.explored = 0
+        self.neighbor_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def measure(self, neighbors, sizes):
+        """
+        Wraps a neighbors function to count every call as one expanded
+        person and every pair it returns as one relaxed edge.
+
+        `sizes` returns the current (frontier size, explored size).
+        """
+        def measured(state):
+            start = time.perf_counter()
+            pairs = neighbors(state)
+            self.neighbor_seconds += time.perf_counter() - start
+            self.expanded += 1
+            self.relaxed += len(pairs)
+            frontier, explored = sizes()
+            self.peak_frontier = max(self.peak_frontier, frontier)
+            self.explored = max(self.explored, explored)
+            return pairs
+        return measured
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __str__(self):
+        return "\n".join([
+            f"Nodes expanded: {self.expanded}",
+            f"Edges relaxed: {self.relaxed}",
+            f"Peak frontier size: {self.peak_frontier}",
+            f"Explored set size: {self.explored}",
+            f"Neighbor expansion time: {self.neighbor_seconds:.6f}s",
+            f"Wall time: {self.wall_seconds:.6f}s",
+        ])
+
+
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Maps each state in the frontier to how many nodes hold it
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +77,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.discard(node)
             return node
 
+    def discard(self, node):
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+
 
 class QueueFrontier(StackFrontier):
     #Breadth-First Search
@@ -33,6 +95,20 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self.discard(node)
             return node
+
+
+def tree_path(person_id, parents):
+    """
+    Returns the (movie_id, person_id) pairs leading from the root
+    of a search tree to `person_id`.
+    """
+    path = []
+    while parents[person_id] is not None:
+        movie_id, parent_id = parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+    return path
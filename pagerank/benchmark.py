@@ -0,0 +1,271 @@
+"""
+Benchmarks for the pagerank engines.
+
+Usage: python benchmark.py solvers [corpus ...] [--pages N] [--tolerance T]
+                                   [--output FILE]
+       python benchmark.py engines directory [--engine E] [--samples N]
+                                   [--limit N] [--output FILE]
+
+`engines` takes an HTML corpus, such as one written by generate.py, or an
+edge list, which only the outofcore engine can rank.
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import outofcore
+import pagerank
+from crawler import cached_crawl
+from matrix import TransitionMatrix, matrix_pagerank, power_iteration
+from sampler import fast_sample_pagerank, parallel_sample_pagerank
+from solvers import SOLVERS, solve, solve_pagerank
+
+DAMPING = 0.85
+CORPORA = ("corpus0", "corpus1", "corpus2")
+
+# Engines that rank a crawled corpus. sample and iterate are pure Python
+# loops, so they only run on small corpora.
+ENGINES = {
+    "sample": lambda corpus, args: pagerank.sample_pagerank(
+        corpus, DAMPING, args.samples),
+    "fast-sample": lambda corpus, args: fast_sample_pagerank(
+        corpus, DAMPING, args.samples, args.seed),
+    "parallel-sample": lambda corpus, args: parallel_sample_pagerank(
+        corpus, DAMPING, args.samples, seed=args.seed)[0],
+    "iterate": lambda corpus, args: pagerank.iterate_pagerank(
+        corpus, DAMPING),
+    "matrix": lambda corpus, args: matrix_pagerank(
+        corpus, DAMPING, pagerank.ERROR),
+    "seidel": lambda corpus, args: solve_pagerank(
+        corpus, DAMPING, "seidel", pagerank.ERROR),
+}
+PURE_PYTHON = ("sample", "iterate")
+
+
+def synthetic_matrix(pages, links=10, dangling=0.05, popularity=2.0, seed=0):
+    """
+    Returns a TransitionMatrix for a random graph of `pages` pages with
+    about `links` links each, where a `dangling` fraction of pages has
+    none and link targets follow a power law, low numbers being the
+    popular pages.
+    """
+    rng = np.random.default_rng(seed)
+    degree = rng.poisson(links, pages)
+    degree[rng.random(pages) < dangling] = 0
+    sources = np.repeat(np.arange(pages), degree)
+    targets = (pages * rng.random(len(sources)) ** popularity).astype(np.int64)
+    # Drop self links and repeated links, as crawl does
+    pairs = np.unique(sources.astype(np.int64) * pages + targets)
+    sources, targets = np.divmod(pairs, pages)
+    keep = sources != targets
+    sources = sources[keep].astype(np.int32)
+    targets = targets[keep].astype(np.int32)
+    out_degree = np.bincount(sources, minlength=pages).astype(np.float64)
+    return TransitionMatrix([f"{page}.html" for page in range(pages)],
+                            sources, targets, out_degree)
+
+
+def benchmark_solvers(name, matrix, tolerance, damping_factor=DAMPING):
+    """
+    Returns one result per solver with the iterations and seconds it
+    takes to reach `tolerance` on `matrix`, and the L1 distance of its
+    ranks from a tightly converged power iteration.
+    """
+    reference = power_iteration(matrix, damping_factor, tolerance=1e-14)
+    results = []
+    for solver in SOLVERS:
+        changes = []
+        start = time.perf_counter()
+        ranks, iterations = solve(
+            matrix, damping_factor, solver, tolerance,
+            callback=lambda iteration, change, seconds: changes.append(change))
+        seconds = time.perf_counter() - start
+        results.append({
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "graph": name,
+            "pages": len(matrix),
+            "links": len(matrix.targets),
+            "solver": solver,
+            "tolerance": tolerance,
+            "iterations": iterations,
+            "seconds": seconds,
+            "error": float(np.abs(ranks - reference).sum()),
+            "changes": changes,
+        })
+    return results
+
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident set size of this process.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def is_edge_list(directory):
+    return os.path.exists(os.path.join(directory, "graph.json"))
+
+
+def rank_outofcore(directory):
+    """
+    Returns (crawl_seconds, rank_seconds, ranks) for the outofcore engine,
+    building a temporary edge list first for an HTML corpus.
+    """
+    scratch = None
+    start = time.perf_counter()
+    if is_edge_list(directory):
+        edge_list = outofcore.EdgeList(directory)
+    else:
+        scratch = tempfile.mkdtemp(prefix="edgelist")
+        edge_list = outofcore.build_edge_list(directory, scratch)
+    crawl_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranks = outofcore.stream_pagerank(edge_list, DAMPING, pagerank.ERROR)
+    rank_seconds = time.perf_counter() - start
+    ranks = dict(zip(edge_list.names(), ranks.tolist()))
+    if scratch is not None:
+        shutil.rmtree(scratch)
+    return crawl_seconds, rank_seconds, ranks
+
+
+def reference_ranks(directory):
+    """
+    Returns PageRank values of the corpus or edge list in `directory`,
+    converged far past the engines' tolerance.
+    """
+    if is_edge_list(directory):
+        edge_list = outofcore.EdgeList(directory)
+        ranks = outofcore.stream_pagerank(edge_list, DAMPING, tolerance=1e-12)
+        return dict(zip(edge_list.names(), ranks.tolist()))
+    return matrix_pagerank(pagerank.crawl(directory), DAMPING, 1e-12)
+
+
+def benchmark_engine(directory, engine, args):
+    """
+    Crawls `directory` and ranks it with `engine`. Returns a dictionary
+    of results, including the L1 and largest error against a reference.
+
+    Peak memory is taken before the reference is computed, but covers
+    the whole process, so run one engine per process.
+    """
+    if engine == "outofcore":
+        crawl_seconds, rank_seconds, ranks = rank_outofcore(directory)
+    else:
+        start = time.perf_counter()
+        corpus = pagerank.crawl(directory)
+        crawl_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        ranks = ENGINES[engine](corpus, args)
+        rank_seconds = time.perf_counter() - start
+    peak = peak_rss_bytes()
+
+    reference = reference_ranks(directory)
+    errors = [abs(ranks.get(page, 0) - rank)
+              for page, rank in reference.items()]
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "directory": directory,
+        "engine": engine,
+        "pages": len(reference),
+        "samples": args.samples if "sample" in engine else None,
+        "crawl_seconds": crawl_seconds,
+        "rank_seconds": rank_seconds,
+        "peak_rss_bytes": peak,
+        "l1_error": sum(errors),
+        "max_error": max(errors, default=0),
+    }
+
+
+def run_engines(args):
+    """
+    Benchmarks every engine that suits the directory, each in its own
+    process so peak memory is measured separately.
+    """
+    if is_edge_list(args.directory):
+        engines = ["outofcore"]
+    else:
+        pages = sum(name.endswith(".html")
+                    for name in os.listdir(args.directory))
+        engines = [engine for engine in list(ENGINES) + ["outofcore"]
+                   if engine not in PURE_PYTHON or pages <= args.limit]
+    for engine in engines:
+        subprocess.run([
+            sys.executable, sys.argv[0], "engines", args.directory,
+            "--engine", engine, "--samples", str(args.samples),
+            "--seed", str(args.seed), "--output", args.output,
+        ], check=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python benchmark.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solvers = commands.add_parser(
+        "solvers", help="compare iterations to tolerance of each solver")
+    solvers.add_argument("corpora", nargs="*", default=list(CORPORA))
+    solvers.add_argument("--pages", type=int, default=1000000,
+                         help="pages of the synthetic graph, 0 for none")
+    solvers.add_argument("--tolerance", type=float, default=1e-8)
+    solvers.add_argument("--output", default="benchmarks.jsonl",
+                         help="file that results are appended to")
+
+    engines = commands.add_parser(
+        "engines", help="time crawling and ranking with each engine")
+    engines.add_argument("directory")
+    engines.add_argument("--engine", default="all",
+                         choices=list(ENGINES) + ["outofcore", "all"])
+    engines.add_argument("--samples", type=int, default=pagerank.SAMPLES)
+    engines.add_argument("--seed", type=int, default=0)
+    engines.add_argument("--limit", type=int, default=20000,
+                         help="most pages for the pure Python engines")
+    engines.add_argument("--output", default="benchmarks.jsonl",
+                         help="file that results are appended to")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.command == "engines":
+        if args.engine == "all":
+            run_engines(args)
+            return
+        result = benchmark_engine(args.directory, args.engine, args)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"{args.engine:<16} crawl {result['crawl_seconds']:.2f}s, "
+              f"rank {result['rank_seconds']:.2f}s, "
+              f"peak {result['peak_rss_bytes'] / 2 ** 20:.0f} MiB, "
+              f"L1 error {result['l1_error']:.2e}")
+        return
+
+    graphs = [(corpus, lambda corpus=corpus: TransitionMatrix.from_corpus(
+        cached_crawl(corpus))) for corpus in args.corpora]
+    if args.pages:
+        graphs.append((f"synthetic-{args.pages}",
+                       lambda: synthetic_matrix(args.pages)))
+
+    print(f"{'graph':<20}{'solver':<12}{'iterations':>12}"
+          f"{'seconds':>10}{'error':>10}")
+    with open(args.output, "a", encoding="utf-8") as f:
+        for name, build in graphs:
+            for result in benchmark_solvers(name, build(), args.tolerance):
+                f.write(json.dumps(result) + "\n")
+                print(f"{name:<20}{result['solver']:<12}"
+                      f"{result['iterations']:>12}{result['seconds']:>10.3f}"
+                      f"{result['error']:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
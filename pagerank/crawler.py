@@ -0,0 +1,164 @@
+"""
+Parallel crawler for pagerank with an on-disk link index.
+
+Pages are parsed by a pool of worker processes, each reading its file in
+chunks. The links found in every page are saved to an index in the corpus
+directory together with the file's (mtime, size), so later crawls only
+parse the pages that changed.
+
+Usage: python crawler.py corpus [--workers N] [--rebuild]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+INDEX = "links.index"
+VERSION = 1
+CHUNK_SIZE = 1 << 20
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Fewest pages to parse before starting worker processes pays off
+POOL_THRESHOLD = 64
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python crawler.py")
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="parse every page, ignoring the index")
+    return parser.parse_args(argv)
+
+
+def page_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Returns the set of link targets in an HTML file, read `chunk_size`
+    characters at a time.
+
+    Text from the last "<" of a chunk on is kept for the next one, so
+    tags split across chunks are still found.
+    """
+    links = set()
+    carry = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = carry + chunk
+            cut = text.rfind("<")
+            if cut < 0:
+                cut = len(text)
+            links.update(LINK_PATTERN.findall(text, 0, cut))
+            carry = text[cut:]
+    links.update(LINK_PATTERN.findall(carry))
+    return links
+
+
+def parse_page(task):
+    filename, path = task
+    return filename, sorted(page_links(path))
+
+
+def file_stats(directory):
+    """
+    Returns the [mtime, size] of every HTML page in `directory`.
+    """
+    stats = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html") and entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def read_index(directory):
+    """
+    Returns the pages recorded in the link index of `directory`, or an
+    empty dict if there is no usable index.
+    """
+    try:
+        with open(os.path.join(directory, INDEX), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("version") != VERSION:
+        return {}
+    return index["pages"]
+
+
+def write_index(directory, pages):
+    filename = os.path.join(directory, INDEX)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    # json.dumps encodes in C, unlike the chunked json.dump
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": VERSION, "pages": pages}))
+    os.replace(temporary, filename)
+
+
+def update_index(directory, workers=None, rebuild=False):
+    """
+    Brings the link index of `directory` up to date and returns
+    (pages, parsed), where `pages` maps each file to its
+    {"stat": [mtime, size], "links": [...]} entry and `parsed` is the
+    number of files that had to be parsed.
+    """
+    stats = file_stats(directory)
+    indexed = {} if rebuild else read_index(directory)
+    pages = {}
+    tasks = []
+    for filename, stat in stats.items():
+        entry = indexed.get(filename)
+        if entry is not None and entry["stat"] == stat:
+            pages[filename] = entry
+        else:
+            tasks.append((filename, os.path.join(directory, filename)))
+
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(tasks) < POOL_THRESHOLD:
+        results = map(parse_page, tasks)
+        for filename, links in results:
+            pages[filename] = {"stat": stats[filename], "links": links}
+    else:
+        chunksize = max(1, len(tasks) // (workers * 16))
+        with multiprocessing.Pool(workers) as pool:
+            for filename, links in pool.imap_unordered(
+                    parse_page, tasks, chunksize=chunksize):
+                pages[filename] = {"stat": stats[filename], "links": links}
+
+    if tasks or len(pages) != len(indexed):
+        write_index(directory, pages)
+    return pages, len(tasks)
+
+
+def cached_crawl(directory, workers=None, rebuild=False):
+    """
+    Parse a directory of HTML pages like `crawl`, reusing the links of
+    pages that did not change since the last crawl.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+    """
+    pages, _ = update_index(directory, workers, rebuild)
+    names = pages.keys()
+    corpus = {}
+    for filename, entry in pages.items():
+        links = names & entry["links"]
+        links.discard(filename)
+        corpus[filename] = links
+    return corpus
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    pages, parsed = update_index(args.corpus, args.workers, args.rebuild)
+    links = sum(len(entry["links"]) for entry in pages.values())
+    print(f"Indexed {len(pages)} pages with {links} links, "
+          f"parsed {parsed}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Writes synthetic web graphs for benchmarking pagerank.
+
+Two models are available. "preferential" is a copying model: each link
+of a new page either goes to a random page or copies the target of a
+random existing link, so pages that are already linked to gain links
+fastest and in-degrees follow a power law. "kronecker" places every link
+by recursively picking a quadrant of the adjacency matrix with skewed
+probabilities, as R-MAT does, which gives power laws and communities.
+A fraction of pages is left without links in both.
+
+The graph is written as a directory of HTML pages, which crawl reads,
+or as an edge list, which outofcore.py ranks without loading. Edge lists
+are streamed to disk and suit up to 10^7 pages and beyond; HTML pages
+are one file each and best kept to 10^5 or so.
+
+Usage: python generate.py directory [--pages N] [--links L]
+                          [--model M] [--format F] [--seed S]
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+import outofcore
+
+MODELS = ("preferential", "kronecker")
+FORMATS = ("html", "edgelist")
+
+# Most pages of the preferential model generated at once
+BLOCK = 1 << 16
+
+# Links of the kronecker model generated at once
+LINK_BLOCK = 1 << 20
+
+# R-MAT quadrant probabilities: top left, top right, bottom left
+QUADRANTS = (0.57, 0.19, 0.19)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python generate.py")
+    parser.add_argument("directory")
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--links", type=float, default=8,
+                        help="mean links per page that has any")
+    parser.add_argument("--model", choices=MODELS, default="preferential")
+    parser.add_argument("--format", choices=FORMATS, default="html")
+    parser.add_argument("--dangling", type=float, default=0.1,
+                        help="fraction of pages without links")
+    parser.add_argument("--copy", type=float, default=0.6,
+                        help="chance a preferential link copies another")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def page_name(page):
+    return f"{page}.html"
+
+
+def preferential_blocks(pages, links, dangling, copy, raw, rng):
+    """
+    Yields (start, stop, sources, targets) for blocks of consecutive
+    source pages of the copying model, after appending their links to
+    the file `raw`.
+
+    Links copy targets from earlier blocks, read back from `raw`, so
+    memory use does not grow with the number of links. Blocks start small
+    and grow with the graph, so early pages already copy links.
+    """
+    written = 0
+    start = 0
+    with open(raw, "wb") as f:
+        while start < pages:
+            stop = min(start + min(max(start // 4, 64), BLOCK), pages)
+            degree = rng.poisson(links, stop - start)
+            degree[rng.random(stop - start) < dangling] = 0
+            sources = np.repeat(np.arange(start, stop, dtype=np.int32), degree)
+            targets = rng.integers(0, pages, len(sources), dtype=np.int32)
+            if written:
+                copied = np.flatnonzero(rng.random(len(sources)) < copy)
+                earlier = np.memmap(raw, dtype=np.int32, mode="r")
+                picks = rng.integers(0, written, len(copied))
+                targets[copied] = earlier[2 * picks + 1]
+                del earlier
+            keep = sources != targets
+            sources, targets = sources[keep], targets[keep]
+            np.column_stack([sources, targets]).tofile(f)
+            f.flush()
+            written += len(sources)
+            yield start, stop, sources, targets
+            start = stop
+
+
+def kronecker_blocks(pages, links, dangling, rng):
+    """
+    Yields (sources, targets) arrays of R-MAT links in blocks, for about
+    `links` links per page that has any.
+    """
+    scale = max(1, math.ceil(math.log2(pages)))
+    is_dangling = rng.random(pages) < dangling
+    remaining = int(pages * (1 - dangling) * links)
+    a, b, c = QUADRANTS
+    while remaining > 0:
+        size = min(LINK_BLOCK, remaining)
+        sources = np.zeros(size, dtype=np.int64)
+        targets = np.zeros(size, dtype=np.int64)
+        for _ in range(scale):
+            quadrant = rng.random(size)
+            sources = 2 * sources + (quadrant >= a + b)
+            targets = 2 * targets + ((quadrant >= a) & (quadrant < a + b)
+                                     | (quadrant >= a + b + c))
+        # Ids past the last page are dropped, as are self links
+        keep = (sources < pages) & (targets < pages) & (sources != targets)
+        sources, targets = sources[keep], targets[keep]
+        keep = ~is_dangling[sources]
+        remaining -= size
+        yield (sources[keep].astype(np.int32), targets[keep].astype(np.int32))
+
+
+def write_html(directory, page, links):
+    with open(os.path.join(directory, page_name(page)), "w",
+              encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html>\n<head>\n<title>{page}</title>\n"
+                f"</head>\n<body>\n<h1>{page}</h1>\n<ul>\n")
+        for link in links:
+            f.write(f"<li><a href=\"{page_name(link)}\">{link}</a></li>\n")
+        f.write("</ul>\n</body>\n</html>\n")
+
+
+def write_html_pages(directory, pages, sources, targets, start=0, stop=None):
+    """
+    Writes an HTML page for every page from `start` to `stop` with the
+    links given by `sources` and `targets`, which must be sorted by
+    source.
+    """
+    stop = pages if stop is None else stop
+    bounds = np.searchsorted(sources, np.arange(start, stop + 1))
+    for page in range(start, stop):
+        write_html(directory, page,
+                   sorted(set(targets[bounds[page - start]:
+                                      bounds[page - start + 1]].tolist())))
+
+
+def generate(directory, pages, links=8, model="preferential", format="html",
+             dangling=0.1, copy=0.6, seed=0):
+    """
+    Writes a synthetic web graph to `directory` in the given format.
+
+    Returns the number of links generated, repeats included.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    edgelist = format == "edgelist"
+    raw = outofcore.scratch_file(directory)
+    in_degree = np.zeros(pages, dtype=np.int64)
+    total = 0
+
+    if model == "preferential":
+        blocks = preferential_blocks(pages, links, dangling, copy, raw, rng)
+        for start, stop, sources, targets in blocks:
+            in_degree += np.bincount(targets, minlength=pages)
+            total += len(sources)
+            if not edgelist:
+                write_html_pages(directory, pages, sources, targets, start,
+                                 stop)
+    else:
+        parts = []
+        with open(raw, "wb") as f:
+            for sources, targets in kronecker_blocks(pages, links, dangling,
+                                                     rng):
+                in_degree += np.bincount(targets, minlength=pages)
+                total += len(sources)
+                if edgelist:
+                    np.column_stack([sources, targets]).tofile(f)
+                else:
+                    parts.append((sources, targets))
+        if not edgelist:
+            sources = np.concatenate([part[0] for part in parts])
+            targets = np.concatenate([part[1] for part in parts])
+            order = np.argsort(sources, kind="stable")
+            write_html_pages(directory, pages, sources[order], targets[order])
+
+    if edgelist:
+        outofcore.write_edge_list(directory, raw, in_degree, page_name)
+    else:
+        os.remove(raw)
+        os.rmdir(os.path.dirname(raw))
+    return total
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    links = generate(args.directory, args.pages, args.links, args.model,
+                     args.format, args.dangling, args.copy, args.seed)
+    print(f"Wrote {args.pages} pages and {links} links to {args.directory} "
+          f"as {args.format}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Incremental PageRank for a corpus that changes a few pages at a time.
+
+The ranks of the last run are stored in the corpus directory with the
+links they were computed from. The next run starts from them, works out
+which links were inserted and deleted, and pushes only the residual
+left by those changes, instead of iterating from a uniform vector.
+
+Usage: python incremental.py corpus [--tolerance T] [--compare]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from crawler import cached_crawl
+from matrix import TransitionMatrix, power_iteration
+from sampler import OutLinks
+from solvers import solve
+
+STATE = "ranks.state"
+DAMPING = 0.85
+
+# Pushes switch to whole rounds over every page once more than one in
+# DENSE pages has a residual over the threshold
+DENSE = 4
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python incremental.py")
+    parser.add_argument("corpus")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--tolerance", type=float, default=1e-10)
+    parser.add_argument("--compare", action="store_true",
+                        help="also iterate from scratch and compare")
+    return parser.parse_args(argv)
+
+
+def read_state(directory, damping_factor, tolerance):
+    """
+    Returns (corpus, ranks, cold_rounds) stored by the last run in
+    `directory` with the same damping factor, or None if there is none.
+    `cold_rounds` is None unless that run had the same tolerance.
+    """
+    try:
+        with open(os.path.join(directory, STATE), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("damping_factor") != damping_factor:
+        return None
+    corpus = {page: set(links) for page, links in state["corpus"].items()}
+    cold_rounds = None
+    if state.get("tolerance") == tolerance:
+        cold_rounds = state.get("cold_rounds")
+    return corpus, state["ranks"], cold_rounds
+
+
+def write_state(directory, corpus, ranks, damping_factor, tolerance,
+                cold_rounds):
+    filename = os.path.join(directory, STATE)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    state = {
+        "damping_factor": damping_factor,
+        "tolerance": tolerance,
+        "cold_rounds": cold_rounds,
+        "corpus": {page: sorted(links) for page, links in corpus.items()},
+        "ranks": ranks
+    }
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(json.dumps(state))
+    os.replace(temporary, filename)
+
+
+def link_changes(old_corpus, new_corpus):
+    """
+    Returns (inserted, deleted) sets of (page, link) pairs between two
+    corpora, counting the links of added and removed pages.
+    """
+    inserted = set()
+    deleted = set()
+    for page in old_corpus.keys() | new_corpus.keys():
+        old_links = old_corpus.get(page, set())
+        new_links = new_corpus.get(page, set())
+        inserted.update((page, link) for link in new_links - old_links)
+        deleted.update((page, link) for link in old_links - new_links)
+    return inserted, deleted
+
+
+def apply_changes(corpus, inserted=(), deleted=()):
+    """
+    Returns a copy of `corpus` with the (page, link) pairs of `deleted`
+    removed and those of `inserted` added. The corpus is not modified.
+    """
+    changed = {page: set(links) for page, links in corpus.items()}
+    for page, link in deleted:
+        changed.get(page, set()).discard(link)
+    for page, link in inserted:
+        changed.setdefault(page, set()).add(link)
+        changed.setdefault(link, set())
+    return changed
+
+
+def push(links, ranks, residual, damping_factor, threshold):
+    """
+    Pushes the residual of every page above `threshold` into its rank
+    and on to the pages it links to, until none is left above it.
+    Updates `ranks` and `residual` in place and returns the number of
+    link and page updates made, scans over every page included.
+
+    `residual` is the change of each rank that one round of the random
+    surfer model would make, so the ranks are exact when it is zero.
+    Only pages reached by a large enough residual are touched, apart
+    from a scan of every page whenever none of those is left. Once
+    more than 1 / DENSE of the pages are active, the residual of every
+    page is pushed at once, as a round of power iteration does.
+    """
+    n = len(links)
+    linked_pages = links.degree > 0
+    # Residual shared by every page, spread by pages without links
+    offset = 0.0
+    # Last position of each page among the links pushed along in a round
+    last = np.empty(n, dtype=np.int64)
+    active = np.empty(0, dtype=np.int64)
+    work = 0
+    while True:
+        if len(active) == 0:
+            # Look for pages over the threshold among all of them, as
+            # the shared residual may have lifted untouched pages over
+            active = np.flatnonzero(np.abs(residual + offset) > threshold)
+            work += n
+            if len(active) == 0:
+                residual += offset
+                return work + n
+
+        if len(active) * DENSE > n:
+            delta = residual + offset
+            ranks += delta
+            shares = np.repeat(
+                damping_factor * delta[linked_pages] / links.degree[linked_pages],
+                links.degree[linked_pages])
+            residual[:] = np.bincount(links.targets, shares, minlength=n)
+            offset = damping_factor * delta[~linked_pages].sum() / n
+            active = np.flatnonzero(np.abs(residual + offset) > threshold)
+            work += len(links.targets) + 2 * n
+            continue
+
+        delta = residual[active] + offset
+        ranks[active] += delta
+        residual[active] = -offset
+        work += len(active)
+
+        degree = links.degree[active]
+        linked = degree > 0
+        counts = degree[linked]
+        touched = np.empty(0, dtype=links.targets.dtype)
+        if len(counts):
+            # Positions in `links.targets` of every link of the active pages
+            starts = links.offsets[active[linked]]
+            ends = np.cumsum(counts)
+            edges = np.repeat(starts - ends + counts, counts) + np.arange(ends[-1])
+            shares = np.repeat(damping_factor * delta[linked] / counts, counts)
+            touched = links.targets[edges]
+            np.add.at(residual, touched, shares)
+            positions = np.arange(len(touched))
+            last[touched] = positions
+            touched = touched[last[touched] == positions]
+            work += len(edges)
+
+        # Pages without links spread their share over every page
+        offset += damping_factor * delta[~linked].sum() / n
+        active = touched[np.abs(residual[touched] + offset) > threshold]
+
+
+def incremental_pagerank(corpus, damping_factor, previous=None,
+                         tolerance=1e-10, cold_rounds=None):
+    """
+    Return PageRank values for each page, starting from the `previous`
+    ranks of the corpus when given, and a report of the work done.
+
+    Pages missing from `previous` start with an average rank. Without
+    `previous` the ranks are computed by power iteration from scratch.
+    Either way it stops once another round of power iteration would
+    change the ranks by less than `tolerance` in L1 distance.
+
+    The report gives the link and page updates made, those a cold start
+    by power iteration needs, the fraction saved, and the rounds of that
+    cold start. `cold_rounds` is the number measured by an earlier cold
+    start; if it is not given, a cold start is run to measure it.
+    """
+    links = OutLinks.from_corpus(corpus)
+    n = len(links)
+    if n == 0:
+        return {}, {"work": 0, "cold_work": 0, "saved": 0.0, "cold_rounds": 0}
+
+    matrix = TransitionMatrix.from_corpus(corpus)
+    round_work = len(links.targets) + n
+    if not previous:
+        ranks, rounds = solve(matrix, damping_factor, "jacobi", tolerance)
+        work = rounds * round_work
+        report = {"work": work, "cold_work": work, "saved": 0.0,
+                  "cold_rounds": rounds}
+        return links.as_dict(ranks), report
+
+    ranks = np.array([previous.get(page, 1 / n) for page in links.pages])
+    if ranks.sum() > 0:
+        ranks /= ranks.sum()
+    else:
+        ranks[:] = 1 / n
+
+    residual = matrix.step(ranks, damping_factor) - ranks
+    # The residual is the change a further round would make, so this
+    # stops where a cold start by `solve` stops: once that change is
+    # below the tolerance in L1 distance
+    threshold = tolerance / n
+    work = round_work
+    work += push(links, ranks, residual, damping_factor, threshold)
+
+    if cold_rounds is None:
+        cold_rounds = solve(matrix, damping_factor, "jacobi", tolerance)[1]
+    cold = cold_rounds * round_work
+    report = {"work": work, "cold_work": cold, "saved": 1 - work / cold,
+              "cold_rounds": cold_rounds}
+    return links.as_dict(ranks), report
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    corpus = cached_crawl(args.corpus)
+    state = read_state(args.corpus, args.damping, args.tolerance)
+    if state is None:
+        previous = cold_rounds = None
+        print("No stored ranks, iterating from a uniform distribution.")
+    else:
+        old_corpus, previous, cold_rounds = state
+        inserted, deleted = link_changes(old_corpus, corpus)
+        print(f"{len(inserted)} links inserted, {len(deleted)} deleted "
+              f"since the last run.")
+
+    ranks, report = incremental_pagerank(
+        corpus, args.damping, previous, args.tolerance, cold_rounds)
+    write_state(args.corpus, corpus, ranks, args.damping, args.tolerance,
+                report["cold_rounds"])
+    print(f"Work: {report['work']} updates, {report['cold_work']} for a "
+          f"cold start ({report['saved']:.1%} saved)")
+
+    if args.compare:
+        matrix = TransitionMatrix.from_corpus(corpus)
+        cold = matrix.as_dict(
+            power_iteration(matrix, args.damping, args.tolerance))
+        difference = sum(abs(ranks[page] - cold[page]) for page in cold)
+        print(f"L1 distance from a cold start: {difference:.2e}")
+
+    for page in sorted(ranks)[:20]:
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
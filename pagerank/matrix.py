@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class TransitionMatrix():
+    """
+    Sparse column-stochastic transition matrix of a corpus.
+
+    Pages are numbered in sorted order. The matrix is kept in coordinate
+    form, sorted by target page: entry `e` moves `weights[e]` of the rank
+    of page `sources[e]` to page `targets[e]`, where the weight is one
+    over the number of links on the source page. Pages without links
+    are listed in `dangling` and spread their rank over every page.
+    """
+
+    def __init__(self, pages, sources, targets, out_degree):
+        self.pages = pages
+        self.index = {page: i for i, page in enumerate(pages)}
+        order = np.argsort(targets, kind="stable")
+        self.sources = sources[order]
+        self.targets = targets[order]
+        self.out_degree = out_degree
+        self.weights = 1 / out_degree[self.sources]
+        self.dangling = np.flatnonzero(out_degree == 0)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix for a corpus as returned by `crawl`, ignoring
+        links to pages outside it. The corpus is not modified.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                if link in index:
+                    sources.append(index[page])
+                    targets.append(index[link])
+        sources = np.array(sources, dtype=np.int32)
+        targets = np.array(targets, dtype=np.int32)
+        out_degree = np.bincount(sources, minlength=len(pages))
+        return cls(pages, sources, targets, out_degree.astype(np.float64))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def step(self, ranks, damping_factor):
+        """
+        Returns the ranks after one round of the random surfer model.
+        """
+        n = len(self.pages)
+        linked = np.bincount(self.targets,
+                             weights=ranks[self.sources] * self.weights,
+                             minlength=n)
+        dangling = ranks[self.dangling].sum()
+        return damping_factor * (linked + dangling / n) + (1 - damping_factor) / n
+
+    def as_dict(self, ranks):
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+def power_iteration(matrix, damping_factor, tolerance=1e-10,
+                    max_iterations=1000):
+    """
+    Returns the PageRank vector of `matrix`, iterating from the uniform
+    distribution until the L1 change of a round is below `tolerance`.
+    """
+    n = len(matrix)
+    ranks = np.full(n, 1 / n)
+    for _ in range(max_iterations):
+        new_ranks = matrix.step(ranks, damping_factor)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=1e-10):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse transition matrix.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    if len(matrix) == 0:
+        return {}
+    return matrix.as_dict(power_iteration(matrix, damping_factor, tolerance))
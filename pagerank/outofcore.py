@@ -0,0 +1,378 @@
+"""
+Out-of-core PageRank over a memory-mapped edge list.
+
+`build` converts a corpus into an edge list directory without holding
+its links in memory. Pages are numbered by decreasing number of incoming
+links, so the ranks read most often share cache lines, and the links are
+stored sorted by target page, as an array of source pages in edges.bin
+and the offset of each target's first link in offsets.npy. `rank` then
+iterates by streaming over chunks of the memory-mapped edges, keeping
+only a few arrays of one float per page in memory. The edge list
+records the number, total size and latest mtime of the pages it was
+built from, and `rank` builds it again when they have changed.
+
+Usage: python outofcore.py build corpus [--output DIR] [--workers N]
+       python outofcore.py rank corpus [--output DIR] [--tolerance T]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+from array import array
+
+import numpy as np
+
+from crawler import file_stats, parse_page
+
+OUTPUT = "edgelist"
+VERSION = 1
+DAMPING = 0.85
+
+# Links read from disk or held in memory at once
+CHUNK_EDGES = 1 << 22
+BUCKET_EDGES = 1 << 24
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python outofcore.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("build", "rank"):
+        command = commands.add_parser(name)
+        command.add_argument("corpus")
+        command.add_argument("--output", default=None,
+                             help=f"edge list directory, corpus/{OUTPUT} "
+                                  f"by default")
+    commands.choices["build"].add_argument("--workers", type=int, default=1)
+    commands.choices["rank"].add_argument("--damping", type=float,
+                                          default=DAMPING)
+    commands.choices["rank"].add_argument("--tolerance", type=float,
+                                          default=1e-10)
+    return parser.parse_args(argv)
+
+
+class EdgeList():
+    """
+    A link graph stored in a directory by `build_edge_list`.
+
+    `sources` and `offsets` are memory-mapped: the links to page `t` come
+    from pages `sources[offsets[t]:offsets[t + 1]]`. `out_degree` is
+    read into memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "graph.json"),
+                  encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != VERSION:
+            raise ValueError(f"{directory} is not a version {VERSION} "
+                             f"edge list")
+        self.pages = header["pages"]
+        self.edges = header["edges"]
+        # Summary of the corpus it was built from, if any
+        self.corpus = header.get("corpus")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"),
+                               mmap_mode="r")
+        self.out_degree = np.load(os.path.join(directory, "out_degree.npy"))
+        if self.edges:
+            self.sources = np.memmap(os.path.join(directory, "edges.bin"),
+                                     dtype=np.int32, mode="r")
+        else:
+            self.sources = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return self.pages
+
+    def names(self):
+        """
+        Yields page names in page number order.
+        """
+        with open(os.path.join(self.directory, "names.txt"),
+                  encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+    def chunks(self, chunk_edges=CHUNK_EDGES):
+        """
+        Yields (start, stop, first, last): ranges of target pages whose
+        links, edges `first` to `last`, number about `chunk_edges`.
+        """
+        start = 0
+        while start < self.pages:
+            first = int(self.offsets[start])
+            stop = int(np.searchsorted(self.offsets, first + chunk_edges,
+                                       side="right")) - 1
+            stop = min(max(stop, start + 1), self.pages)
+            yield start, stop, first, int(self.offsets[stop])
+            start = stop
+
+    def step(self, ranks, damping_factor, chunk_edges=CHUNK_EDGES):
+        """
+        Returns the ranks after one round of the random surfer model,
+        reading the links one chunk at a time.
+        """
+        n = self.pages
+        linked = self.out_degree > 0
+        share = np.zeros(n)
+        np.divide(ranks, self.out_degree, out=share, where=linked)
+        dangling = ranks[~linked].sum()
+
+        new_ranks = np.empty(n)
+        for start, stop, first, last in self.chunks(chunk_edges):
+            counts = np.diff(self.offsets[start:stop + 1])
+            targets = np.repeat(np.arange(stop - start), counts)
+            new_ranks[start:stop] = np.bincount(
+                targets, weights=share[self.sources[first:last]],
+                minlength=stop - start)
+        new_ranks += dangling / n
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor) / n
+        return new_ranks
+
+
+def page_links(directory, filenames, workers):
+    """
+    Yields the sorted links of each of `filenames` in order, parsed by
+    `workers` processes.
+    """
+    tasks = ((filename, os.path.join(directory, filename))
+             for filename in filenames)
+    if workers <= 1:
+        for _, links in map(parse_page, tasks):
+            yield links
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for _, links in pool.imap(parse_page, tasks, chunksize=64):
+            yield links
+
+
+def write_raw_edges(directory, filenames, index, filename, workers):
+    """
+    Writes the (source, target) pairs of every page to `filename` as
+    int32 pairs, in the order of `filenames`. Returns the number of links
+    to each page.
+    """
+    n = len(filenames)
+    in_degree = np.zeros(n, dtype=np.int64)
+    buffer = array("i")
+    with open(filename, "wb") as f:
+        links_of = page_links(directory, filenames, workers)
+        for source, links in enumerate(links_of):
+            for link in links:
+                target = index.get(link)
+                if target is not None and target != source:
+                    buffer.append(source)
+                    buffer.append(target)
+            if len(buffer) >= 2 * CHUNK_EDGES:
+                targets = np.frombuffer(buffer, dtype=np.int32)[1::2]
+                in_degree += np.bincount(targets, minlength=n)
+                buffer.tofile(f)
+                buffer = array("i")
+        targets = np.frombuffer(buffer, dtype=np.int32)[1::2]
+        in_degree += np.bincount(targets, minlength=n)
+        buffer.tofile(f)
+    return in_degree
+
+
+def sort_edges(raw, filename, order, in_degree, scratch):
+    """
+    Writes the sources of the links in `raw` to `filename`, sorted by
+    target page and then source page, after numbering pages by their
+    position in `order`. Repeated links are written once.
+
+    Links are first spread over bucket files by range of target page,
+    each small enough to sort in memory. Returns the number of links to
+    and from each page, in the new numbering.
+    """
+    n = len(order)
+    number = np.empty(n, dtype=np.int32)
+    number[order] = np.arange(n, dtype=np.int32)
+    cumulative = np.cumsum(in_degree[order])
+    edges = int(cumulative[-1]) if n else 0
+
+    # First target page of each bucket
+    bounds = np.searchsorted(
+        cumulative, np.arange(BUCKET_EDGES, edges, BUCKET_EDGES), side="left")
+    bounds = np.unique(np.concatenate([[0], bounds + 1]))
+    bounds = bounds[bounds < n]
+    buckets = [open(os.path.join(scratch, f"bucket{i}.bin"), "wb")
+               for i in range(len(bounds))]
+    try:
+        raw_pairs = np.memmap(raw, dtype=np.int32, mode="r") if edges else []
+        for first in range(0, 2 * edges, 2 * CHUNK_EDGES):
+            pairs = np.array(raw_pairs[first:first + 2 * CHUNK_EDGES])
+            pairs = number[pairs].reshape(-1, 2)
+            bucket = np.searchsorted(bounds, pairs[:, 1], side="right") - 1
+            order_in_chunk = np.argsort(bucket, kind="stable")
+            pairs = pairs[order_in_chunk]
+            splits = np.searchsorted(bucket[order_in_chunk],
+                                     np.arange(1, len(bounds)))
+            for i, part in enumerate(np.split(pairs, splits)):
+                part.tofile(buckets[i])
+        del raw_pairs
+    finally:
+        for bucket in buckets:
+            bucket.close()
+
+    in_counts = np.zeros(n, dtype=np.int64)
+    out_counts = np.zeros(n, dtype=np.int64)
+    with open(filename, "wb") as f:
+        for i in range(len(bounds)):
+            path = os.path.join(scratch, f"bucket{i}.bin")
+            pairs = np.fromfile(path, dtype=np.int32).reshape(-1, 2)
+            pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+            repeated = np.zeros(len(pairs), dtype=bool)
+            repeated[1:] = np.all(pairs[1:] == pairs[:-1], axis=1)
+            pairs = pairs[~repeated]
+            pairs[:, 0].tofile(f)
+            in_counts += np.bincount(pairs[:, 1], minlength=n)
+            out_counts += np.bincount(pairs[:, 0], minlength=n)
+            os.remove(path)
+    return in_counts, out_counts
+
+
+def write_edge_list(output, raw, in_degree, name, corpus=None):
+    """
+    Turns a file of int32 (source, target) pairs in `output`/scratch
+    into the edge list in `output`, and returns it as an EdgeList.
+
+    `in_degree` gives the number of links to each page, repeats included,
+    and `name(page)` its name. `corpus` is recorded as the summary of the
+    pages it was built from. The scratch directory is removed.
+    """
+    scratch = os.path.join(output, "scratch")
+    # Most linked pages first; ties keep their order
+    order = np.argsort(-in_degree, kind="stable")
+    in_counts, out_counts = sort_edges(
+        raw, os.path.join(output, "edges.bin"), order, in_degree, scratch)
+    shutil.rmtree(scratch)
+
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(in_counts, out=offsets[1:])
+    np.save(os.path.join(output, "offsets.npy"), offsets)
+    np.save(os.path.join(output, "out_degree.npy"),
+            out_counts.astype(np.float64))
+    with open(os.path.join(output, "names.txt"), "w",
+              encoding="utf-8") as f:
+        for page in order:
+            f.write(name(page) + "\n")
+    with open(os.path.join(output, "graph.json"), "w",
+              encoding="utf-8") as f:
+        json.dump({"version": VERSION, "pages": len(order),
+                   "edges": int(offsets[-1]), "corpus": corpus}, f)
+    return EdgeList(output)
+
+
+def scratch_file(output):
+    """
+    Returns the path for raw pairs in a new scratch directory of `output`.
+    """
+    scratch = os.path.join(output, "scratch")
+    os.makedirs(scratch, exist_ok=True)
+    return os.path.join(scratch, "raw.bin")
+
+
+def build_edge_list(directory, output=None, workers=1):
+    """
+    Converts the HTML pages of `directory` into an edge list in `output`
+    and returns it as an EdgeList.
+
+    Links are streamed to disk as they are parsed and sorted in buckets,
+    so memory use is bounded by the number of pages, not links.
+    """
+    output = output or os.path.join(directory, OUTPUT)
+    raw = scratch_file(output)
+    # Taken first, so pages changed while building make it out of date
+    stats = file_stats(directory)
+    filenames = sorted(stats)
+    index = {name: i for i, name in enumerate(filenames)}
+    in_degree = write_raw_edges(directory, filenames, index, raw, workers)
+    del index
+    return write_edge_list(output, raw, in_degree, filenames.__getitem__,
+                           corpus_summary(stats))
+
+
+def corpus_summary(stats):
+    """
+    Returns the number of pages, their total size and latest mtime, from
+    the `file_stats` of a corpus.
+    """
+    return {"pages": len(stats),
+            "bytes": sum(size for _, size in stats.values()),
+            "mtime": max((mtime for mtime, _ in stats.values()), default=0)}
+
+
+def current_edge_list(directory, output=None, workers=1):
+    """
+    Returns the edge list of `directory` in `output`, building it again
+    if there is none or the pages have changed since it was built.
+    Edge lists with no corpus summary, such as generated ones, are used
+    as they are.
+    """
+    output = output or os.path.join(directory, OUTPUT)
+    try:
+        edge_list = EdgeList(output)
+    except (OSError, ValueError):
+        return build_edge_list(directory, output, workers)
+    if (edge_list.corpus is not None
+            and edge_list.corpus != corpus_summary(file_stats(directory))):
+        return build_edge_list(directory, output, workers)
+    return edge_list
+
+
+def stream_pagerank(edge_list, damping_factor, tolerance=1e-10,
+                    max_iterations=1000, chunk_edges=CHUNK_EDGES):
+    """
+    Returns the PageRank vector of `edge_list` in page number order,
+    iterating from the uniform distribution until the L1 change of a
+    round is below `tolerance`.
+    """
+    n = len(edge_list)
+    ranks = np.full(n, 1 / n)
+    for _ in range(max_iterations):
+        new_ranks = edge_list.step(ranks, damping_factor, chunk_edges)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks
+
+
+def outofcore_pagerank(directory, damping_factor, tolerance=1e-10,
+                       output=None):
+    """
+    Return PageRank values for each page of `directory` by streaming over
+    its edge list, building the edge list first if there is none or it
+    is out of date.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    edge_list = current_edge_list(directory, output)
+    if len(edge_list) == 0:
+        return {}
+    ranks = stream_pagerank(edge_list, damping_factor, tolerance)
+    return {page: float(rank) for page, rank in zip(edge_list.names(), ranks)}
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    output = args.output or os.path.join(args.corpus, OUTPUT)
+    if args.command == "build":
+        edge_list = build_edge_list(args.corpus, output, args.workers)
+        print(f"Wrote {len(edge_list)} pages and {edge_list.edges} links "
+              f"to {output}.")
+        return
+
+    edge_list = current_edge_list(args.corpus, output)
+    ranks = stream_pagerank(edge_list, args.damping, args.tolerance)
+    print("PageRank Results from Streaming")
+    for page, rank in sorted(zip(edge_list.names(), ranks)):
+        print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,83 @@
+import argparse
 import os
 import random
 import re
 import sys
 
+from crawler import cached_crawl
+from matrix import matrix_pagerank
+from sampler import fast_sample_pagerank, parallel_sample_pagerank
+from solvers import SOLVERS, solve_pagerank
+
 DAMPING = 0.85
 SAMPLES = 10000
 ERROR = 0.01
 
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python pagerank.py")
+    parser.add_argument("corpus")
+    parser.add_argument("--cached-crawl", action="store_true",
+                        help="crawl in parallel, reusing the link index")
+    parser.add_argument("--matrix", action="store_true",
+                        help="iterate with the sparse matrix engine")
+    parser.add_argument("--solver", choices=sorted(SOLVERS),
+                        help="iterate with this solver instead")
+    parser.add_argument("--tolerance", type=float, default=ERROR,
+                        help="L1 change at which the solver stops")
+    parser.add_argument("--trace", action="store_true",
+                        help="print each iteration of the solver")
+    parser.add_argument("--fast-sampling", action="store_true",
+                        help="sample with batched walks over link arrays")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="sample in this many processes, 0 for one")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for reproducible fast or parallel sampling")
+    return parser.parse_args(argv)
+
+
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    args = parse_args(sys.argv[1:])
+    if args.cached_crawl:
+        corpus = cached_crawl(args.corpus)
+    else:
+        corpus = crawl(args.corpus)
+    # Shared by the original sampling and iteration engines
+    structure = LinkStructure(corpus)
+    errors = None
+    if args.workers:
+        ranks, errors = parallel_sample_pagerank(
+            corpus, DAMPING, args.samples, args.workers, args.seed)
+    elif args.fast_sampling:
+        ranks = fast_sample_pagerank(corpus, DAMPING, args.samples, args.seed)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, args.samples, structure)
+    print(f"PageRank Results from Sampling (n = {args.samples})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    if args.workers == 1:
+        print("No standard error from a single worker.")
+    elif errors is not None:
+        print(f"Largest standard error across workers: "
+              f"{max(errors.values()):.6f}")
+    if args.solver:
+        ranks = solve_pagerank(corpus, DAMPING, args.solver, args.tolerance,
+                               print_iteration if args.trace else None)
+    elif args.matrix:
+        ranks = matrix_pagerank(corpus, DAMPING)
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING, structure)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
+def print_iteration(iteration, change, seconds):
+    print(f"  iteration {iteration}: L1 change {change:.3e} "
+          f"after {seconds * 1000:.2f} ms")
+
+
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
@@ -74,61 +130,103 @@ def transition_model(corpus, page, damping_factor):
     return model
 
 
-def sample_pagerank(corpus, damping_factor, n):
+class LinkStructure():
+    """
+    Link structure of a corpus, built once for the rank engines.
+
+    `links` maps each page to a tuple of the pages it links to, and
+    `incoming` to a tuple of the pages linking to it. Pages without
+    links are listed in `dangling`: the random surfer leaves them for any
+    page, so their rank is spread over every page as one dangling mass
+    rather than as links to all pages.
+    """
+
+    def __init__(self, corpus):
+        self.pages = tuple(corpus)
+        self.links = {page: tuple(link for link in corpus[page]
+                                  if link in corpus)
+                      for page in self.pages}
+        incoming = {page: [] for page in self.pages}
+        for page, links in self.links.items():
+            for link in links:
+                incoming[link].append(page)
+        self.incoming = {page: tuple(sources)
+                         for page, sources in incoming.items()}
+        self.out_degree = {page: len(links)
+                           for page, links in self.links.items()}
+        self.dangling = tuple(page for page in self.pages
+                              if self.out_degree[page] == 0)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def dangling_mass(self, ranks):
+        return sum(ranks[page] for page in self.dangling)
+
+
+def sample_pagerank(corpus, damping_factor, n, structure=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
+    `structure` is the LinkStructure of the corpus, built if not given.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    structure = structure or LinkStructure(corpus)
     visits = dict()
-    for key in corpus:
+    for key in structure.pages:
         visits[key] = 0
 
-    page = random.choice(list(corpus.keys()))
+    # Each step follows the transition model without building it: a
+    # random link with probability `damping_factor`, else any page
+    page = random.choice(structure.pages)
     visits[page] += 1
     total = 1
     for i in range(n-1):
-        transition = transition_model(corpus, page, damping_factor)
-        page = random.choices(list(transition.keys()), list(transition.values()))[0]
+        links = structure.links[page]
+        if links and random.random() < damping_factor:
+            page = random.choice(links)
+        else:
+            page = random.choice(structure.pages)
         total += 1
         visits[page] += 1
 
     model = dict()
-    for key in corpus:
+    for key in structure.pages:
         model[key] = visits[key]/total
 
     return model
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, structure=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until convergence. `structure` is the LinkStructure
+    of the corpus, built if not given.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    structure = structure or LinkStructure(corpus)
+    n = len(structure)
     model = dict()
-    for key in corpus:
+    for key in structure.pages:
         #set all values to 1/n
-        model[key] = 1/len(corpus)
-        #if page has no links, link to all pages including itself
-        if len(corpus[key]) == 0:
-            corpus[key] = list(corpus.keys())
-    
+        model[key] = 1/n
+
     while True:
-        #create new model with values from model
-        new_model = model.copy()
+        #pages with no links link to all pages including themselves
+        base = ((1-damping_factor)/n
+                + damping_factor*structure.dangling_mass(model)/n)
 
-        #update new model
-        for page in model:
-            new_model[page] = (1-damping_factor)/len(corpus)
-            for key in corpus:
-                if page in corpus[key]:
-                    new_model[page] += damping_factor*model[key]/len(corpus[key])
+        #update new model from the pages linking to each page
+        new_model = dict()
+        for page in structure.pages:
+            new_model[page] = base + damping_factor*sum(
+                model[key]/structure.out_degree[key]
+                for key in structure.incoming[page])
 
         #check if new model is close enough to model
         finished = True
@@ -138,7 +236,7 @@ def iterate_pagerank(corpus, damping_factor):
                 break
 
         model = new_model
-        
+
         if finished:
             return new_model
 
@@ -0,0 +1,202 @@
+"""
+Personalized and topic-sensitive PageRank.
+
+A teleport distribution replaces the uniform jump of the random surfer:
+with probability 1 - damping_factor, and from pages without links, the
+surfer jumps to a page drawn from it. Many distributions are iterated
+together as the columns of one matrix, in one pass over the links per
+round, and each stops as soon as it has converged. Single pages can
+also be ranked approximately by forward push, which only touches pages
+near the source.
+
+Usage: python personalized.py corpus PAGE [PAGE ...] [--push EPSILON]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from crawler import cached_crawl
+from matrix import TransitionMatrix
+from sampler import OutLinks
+
+DAMPING = 0.85
+
+# Most values gathered at once by batch_step, links times columns
+BLOCK_VALUES = 1 << 18
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python personalized.py")
+    parser.add_argument("corpus")
+    parser.add_argument("pages", nargs="+",
+                        help="pages to personalize for, one ranking each")
+    parser.add_argument("--push", type=float, default=None,
+                        metavar="EPSILON",
+                        help="approximate by forward push instead")
+    return parser.parse_args(argv)
+
+
+def teleport_matrix(matrix, preferences):
+    """
+    Returns an n x k array whose columns are the teleport distributions
+    of `preferences`, a list of dicts mapping pages to weights. Pages
+    outside the corpus are ignored.
+    """
+    teleports = np.zeros((len(matrix), len(preferences)))
+    for column, weights in enumerate(preferences):
+        for page, weight in weights.items():
+            if page in matrix.index:
+                teleports[matrix.index[page], column] = weight
+        total = teleports[:, column].sum()
+        if total <= 0:
+            raise ValueError(f"preference {column} has no weight on any page")
+        teleports[:, column] /= total
+    return teleports
+
+
+def batch_step(matrix, ranks, teleports, damping_factor):
+    """
+    Returns the n x k ranks after one round of the random surfer model
+    for every column of `ranks`, each with its own teleport column.
+
+    The links are read once for all columns: the ranks of the sources
+    of a chunk of links are gathered as one links x k block and summed
+    into their targets by a single bincount.
+    """
+    n, k = ranks.shape
+    # Rows are gathered, so keep each page's k ranks together
+    by_page = np.ascontiguousarray(ranks)
+    linked = np.zeros((n, k))
+    columns = np.arange(k)
+    chunk = max(1, BLOCK_VALUES // k)
+    for first in range(0, len(matrix.targets), chunk):
+        targets = matrix.targets[first:first + chunk]
+        block = by_page.take(matrix.sources[first:first + chunk], axis=0)
+        block *= matrix.weights[first:first + chunk, None]
+        # Links are sorted by target, so a chunk's targets are one range
+        low, high = int(targets[0]), int(targets[-1]) + 1
+        cells = (targets - low).astype(np.int64)[:, None] * k + columns
+        linked[low:high] += np.bincount(
+            cells.ravel(), weights=block.ravel(),
+            minlength=(high - low) * k).reshape(high - low, k)
+    dangling = ranks[matrix.dangling].sum(axis=0)
+    return (damping_factor * linked
+            + (damping_factor * dangling + 1 - damping_factor) * teleports)
+
+
+def batch_pagerank(matrix, teleports, damping_factor, tolerance=1e-10,
+                   max_iterations=1000):
+    """
+    Returns the n x k PageRank vectors for the teleport distributions in
+    the columns of `teleports`, iterating from the distributions
+    themselves. A column stops being updated once the L1 change of a
+    round is below `tolerance`.
+    """
+    ranks = np.array(teleports, dtype=np.float64, order="F")
+    active = np.arange(ranks.shape[1])
+    for _ in range(max_iterations):
+        if len(active) == 0:
+            break
+        new_ranks = batch_step(
+            matrix, ranks[:, active], teleports[:, active], damping_factor)
+        change = np.abs(new_ranks - ranks[:, active]).sum(axis=0)
+        ranks[:, active] = new_ranks
+        active = active[change >= tolerance]
+    return ranks
+
+
+def personalized_pagerank(corpus, damping_factor, preferences,
+                          tolerance=1e-10):
+    """
+    Return PageRank values for each page and each of `preferences`, a
+    list of dicts mapping pages to teleport weights; a topic is the set
+    of its pages with equal weights.
+
+    Return a list with one dictionary per preference where keys are page
+    names, and values are their PageRank value (a value between 0 and 1).
+    All PageRank values of a dictionary should sum to 1.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    teleports = teleport_matrix(matrix, preferences)
+    ranks = batch_pagerank(matrix, teleports, damping_factor, tolerance)
+    return [matrix.as_dict(ranks[:, column])
+            for column in range(len(preferences))]
+
+
+def forward_push(links, source, damping_factor, epsilon=1e-6):
+    """
+    Returns approximate PageRank values personalized to the page numbered
+    `source` of `links`, as a dict from page numbers to values.
+
+    Pushes the residual of any page above `epsilon` times its number of
+    links, so the work is bounded by 1 / (epsilon * (1 - damping_factor))
+    whatever the size of the corpus. Values only err on the low side, by
+    a total that is at most the residual left: `epsilon` times the
+    number of links, at most, for each page.
+    """
+    # Python ints are much faster to index one at a time than numpy's
+    offsets = links.offsets.tolist()
+    targets = links.targets
+    ranks = {}
+    residual = {source: 1.0}
+    queue = [source]
+    while queue:
+        page = queue.pop()
+        start, end = offsets[page], offsets[page + 1]
+        mass = residual[page]
+        if mass <= epsilon * max(end - start, 1):
+            continue
+        residual[page] = 0.0
+        ranks[page] = ranks.get(page, 0.0) + (1 - damping_factor) * mass
+
+        # Pages without links send the surfer back to the source
+        if start == end:
+            receivers = [source]
+            share = damping_factor * mass
+        else:
+            receivers = targets[start:end].tolist()
+            share = damping_factor * mass / (end - start)
+        for target in receivers:
+            residual[target] = residual.get(target, 0.0) + share
+            degree = max(offsets[target + 1] - offsets[target], 1)
+            if residual[target] > epsilon * degree:
+                queue.append(target)
+    return ranks
+
+
+def push_pagerank(corpus, damping_factor, page, epsilon=1e-6):
+    """
+    Return approximate PageRank values personalized to `page` by forward
+    push, as a dictionary where keys are page names. Pages the push does
+    not reach are left out.
+    """
+    links = OutLinks.from_corpus(corpus)
+    source = links.pages.index(page)
+    ranks = forward_push(links, source, damping_factor, epsilon)
+    return {links.pages[i]: rank for i, rank in sorted(ranks.items())}
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    corpus = cached_crawl(args.corpus)
+    for page in args.pages:
+        if page not in corpus:
+            sys.exit(f"Page {page} is not in the corpus.")
+
+    if args.push is not None:
+        rankings = [push_pagerank(corpus, DAMPING, page, args.push)
+                    for page in args.pages]
+    else:
+        rankings = personalized_pagerank(
+            corpus, DAMPING, [{page: 1} for page in args.pages])
+
+    for page, ranks in zip(args.pages, rankings):
+        print(f"PageRank personalized to {page}")
+        best = sorted(ranks, key=ranks.get, reverse=True)[:10]
+        for other in best:
+            print(f"  {other}: {ranks[other]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
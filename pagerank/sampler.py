@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+# Fewest samples each surfer draws, so starting pages do not bias ranks
+MIN_WALK = 1000
+
+# Links shared by the processes of parallel_sample_pagerank
+worker_links = None
+
+
+class OutLinks():
+    """
+    Links of every page of a corpus in compressed sparse row form.
+
+    Pages are numbered in sorted order; the pages linked to by page `p`
+    are `targets[offsets[p]:offsets[p + 1]]`.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+        self.degree = np.diff(offsets)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the links of a corpus as returned by `crawl`, ignoring
+        links to pages outside it. The corpus is not modified.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = [0]
+        targets = []
+        for page in pages:
+            targets.extend(sorted(index[link] for link in corpus[page]
+                                  if link in index))
+            offsets.append(len(targets))
+        return cls(pages, np.array(offsets, dtype=np.int64),
+                   np.array(targets, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def as_dict(self, values):
+        return {page: float(value) for page, value in zip(self.pages, values)}
+
+
+def sample_visits(links, damping_factor, n, rng, walkers=10000):
+    """
+    Returns how often each page is visited in `n` samples of the random
+    surfer model, drawn with the numpy Generator `rng`.
+
+    Runs up to `walkers` independent surfers side by side, each starting
+    at a random page and drawing at least `MIN_WALK` samples. A step
+    costs O(1) per surfer: with probability `damping_factor` it follows a
+    uniformly chosen link of its page, and otherwise, or if the page has
+    no links, it jumps to any page.
+    """
+    pages = len(links)
+    counts = np.zeros(pages, dtype=np.int64)
+    walkers = max(1, min(walkers, n // MIN_WALK))
+    current = rng.integers(0, pages, walkers)
+    remaining = n
+    while remaining > 0:
+        if remaining < len(current):
+            current = current[:remaining]
+        counts += np.bincount(current, minlength=pages)
+        remaining -= len(current)
+
+        degree = links.degree[current]
+        follow = (rng.random(len(current)) < damping_factor) & (degree > 0)
+        following = current[follow]
+        choice = (rng.random(len(following)) * degree[follow]).astype(np.int64)
+        current = rng.integers(0, pages, len(current))
+        current[follow] = links.targets[links.offsets[following] + choice]
+    return counts
+
+
+def fast_sample_pagerank(corpus, damping_factor, n, seed=None, walkers=10000):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    batched random surfers over precomputed link arrays.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1. A given `seed` always gives the
+    same result.
+    """
+    links = OutLinks.from_corpus(corpus)
+    if len(links) == 0 or n <= 0:
+        return {page: 0 for page in corpus}
+    rng = np.random.default_rng(seed)
+    counts = sample_visits(links, damping_factor, n, rng, walkers)
+    return links.as_dict(counts / n)
+
+
+def init_worker(links):
+    global worker_links
+    worker_links = links
+
+
+def sample_worker(task):
+    """
+    Returns the visit counts of one worker's share of the samples.
+    """
+    damping_factor, n, seed, walkers = task
+    rng = np.random.default_rng(seed)
+    return sample_visits(worker_links, damping_factor, n, rng, walkers)
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, workers=None,
+                             seed=None, walkers=10000):
+    """
+    Return PageRank values for each page by sampling `n` pages split
+    over `workers` processes, and the standard error of each value.
+
+    Every worker draws from its own stream spawned from `seed`, so a
+    given seed and number of workers always gives the same result. The
+    link arrays are built once and shared with the workers read-only.
+    The standard error comes from the spread of the workers' estimates:
+    when it is small next to the ranks, enough samples have been drawn.
+    A single worker gives no spread, and its errors are NaN.
+    """
+    links = OutLinks.from_corpus(corpus)
+    workers = workers or os.cpu_count()
+    workers = max(1, min(workers, n))
+    if len(links) == 0 or n <= 0:
+        return {page: 0 for page in corpus}, {page: 0 for page in corpus}
+
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n // workers + (i < n % workers) for i in range(workers)]
+    tasks = [(damping_factor, share, stream, walkers)
+             for share, stream in zip(shares, streams)]
+    if workers == 1:
+        init_worker(links)
+        counts = list(map(sample_worker, tasks))
+    else:
+        with multiprocessing.Pool(workers, init_worker, (links,)) as pool:
+            counts = pool.map(sample_worker, tasks)
+
+    counts = np.array(counts)
+    ranks = counts.sum(axis=0) / n
+    if workers > 1:
+        estimates = counts / np.array(shares)[:, None]
+        errors = estimates.std(axis=0, ddof=1) / np.sqrt(workers)
+    else:
+        errors = np.full(len(links), np.nan)
+    return links.as_dict(ranks), links.as_dict(errors)
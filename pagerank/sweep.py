@@ -0,0 +1,174 @@
+"""
+PageRank for many damping factors in one pass.
+
+PageRank with damping factor d is the power series
+(1 - d) * sum(d ** k * M ** k * u for k >= 0), where M moves rank along
+links and u is the uniform distribution. The vectors M ** k * u do not
+depend on d, so one sequence of them gives the ranks for every damping
+factor. Once they stop changing, the rest of the series is added in
+closed form.
+Sampling works the same way: the page a surfer is on after k steps,
+never teleporting, is a sample of M ** k * u, so one set of walks serves
+every damping factor.
+
+Usage: python sweep.py corpus D [D ...] [--samples N] [--seed S]
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from crawler import cached_crawl
+from matrix import TransitionMatrix
+from sampler import OutLinks
+from solvers import solve
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python sweep.py")
+    parser.add_argument("corpus")
+    parser.add_argument("damping_factors", nargs="+", type=float)
+    parser.add_argument("--tolerance", type=float, default=1e-10)
+    parser.add_argument("--samples", type=int, default=0,
+                        help="estimate from this many walks instead")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def series_terms(damping_factors, tolerance):
+    """
+    Returns the number of terms of the power series needed for an L1
+    error below `tolerance` at every damping factor.
+    """
+    largest = max(damping_factors)
+    if largest <= 0:
+        return 1
+    return max(1, math.ceil(math.log(tolerance) / math.log(largest)))
+
+
+def series_sweep(matrix, damping_factors, tolerance=1e-10):
+    """
+    Returns an n x len(damping_factors) array with the PageRank vector
+    of `matrix` for each damping factor, and the number of steps taken.
+
+    Steps stop once the L1 change of M ** k * u is below `tolerance`, as
+    power iteration does, and the remaining terms, sum(d ** j for j >= k)
+    times the last vector, are added at once. Graphs where the vectors
+    keep cycling stop after enough terms for the series to be within
+    `tolerance` at the largest damping factor.
+    """
+    n = len(matrix)
+    factors = np.asarray(damping_factors, dtype=np.float64)
+    terms = series_terms(factors, tolerance)
+    term = np.full(n, 1 / n)
+    weights = 1 - factors
+    ranks = np.zeros((n, len(factors)))
+    for step in range(terms):
+        ranks += np.outer(term, weights)
+        weights = weights * factors
+        # A damping factor of one is a plain step along the links
+        new_term = matrix.step(term, 1.0)
+        change = np.abs(new_term - term).sum()
+        term = new_term
+        if change < tolerance:
+            break
+    # weights are now (1 - d) * d ** k, and the tail sums to d ** k
+    ranks += np.outer(term, weights / (1 - factors))
+    return ranks, step + 1
+
+
+def walk_sweep(links, damping_factors, walkers, rng, tolerance=1e-4):
+    """
+    Returns an n x len(damping_factors) array of PageRank estimates from
+    `walkers` surfers that start at random pages and follow links for as
+    many steps as the largest damping factor needs.
+
+    Each surfer counts for (1 - d) * d ** k at its page after step k,
+    and for d ** k at its page after the last step.
+    """
+    n = len(links)
+    factors = np.asarray(damping_factors, dtype=np.float64)
+    terms = series_terms(factors, tolerance)
+    weights = 1 - factors
+    current = rng.integers(0, n, walkers)
+    ranks = np.zeros((n, len(factors)))
+    for _ in range(terms):
+        visits = np.bincount(current, minlength=n) / walkers
+        ranks += np.outer(visits, weights)
+        weights = weights * factors
+
+        # Pages without links send their surfers anywhere
+        degree = links.degree[current]
+        following = degree > 0
+        choice = (rng.random(following.sum()) * degree[following]).astype(
+            np.int64)
+        next_pages = rng.integers(0, n, walkers)
+        next_pages[following] = links.targets[
+            links.offsets[current[following]] + choice]
+        current = next_pages
+    # The surfers' last pages stand in for the rest of the series
+    visits = np.bincount(current, minlength=n) / walkers
+    ranks += np.outer(visits, weights / (1 - factors))
+    return ranks
+
+
+def sweep_pagerank(corpus, damping_factors, tolerance=1e-10):
+    """
+    Return PageRank values for each page and each damping factor.
+
+    Return a dictionary mapping each damping factor to a dictionary where
+    keys are page names, and values are their PageRank value (a value
+    between 0 and 1). All PageRank values of a damping factor should
+    sum to 1.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    ranks, _ = series_sweep(matrix, damping_factors, tolerance)
+    return {d: matrix.as_dict(ranks[:, column])
+            for column, d in enumerate(damping_factors)}
+
+
+def sample_sweep_pagerank(corpus, damping_factors, walkers, seed=None):
+    """
+    Return PageRank values for each page and each damping factor,
+    estimated from one set of `walkers` random walks.
+
+    Return a dictionary mapping each damping factor to a dictionary where
+    keys are page names, and values are their estimated PageRank value.
+    """
+    links = OutLinks.from_corpus(corpus)
+    rng = np.random.default_rng(seed)
+    ranks = walk_sweep(links, damping_factors, walkers, rng)
+    return {d: links.as_dict(ranks[:, column])
+            for column, d in enumerate(damping_factors)}
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    corpus = cached_crawl(args.corpus)
+    factors = args.damping_factors
+    if any(not 0 <= d < 1 for d in factors):
+        sys.exit("Damping factors must be at least 0 and below 1.")
+
+    if args.samples:
+        table = sample_sweep_pagerank(corpus, factors, args.samples,
+                                      args.seed)
+        print(f"PageRank Results from {args.samples} walks")
+    else:
+        matrix = TransitionMatrix.from_corpus(corpus)
+        ranks, steps = series_sweep(matrix, factors, args.tolerance)
+        table = {d: matrix.as_dict(ranks[:, column])
+                 for column, d in enumerate(factors)}
+        separate = sum(solve(matrix, d, "jacobi", args.tolerance)[1]
+                       for d in factors)
+        print(f"PageRank Results from {steps} steps "
+              f"({separate} for separate runs)")
+
+    print(f"  {'page':<30}" + "".join(f"{d:>10.3f}" for d in factors))
+    for page in sorted(corpus):
+        print(f"  {page:<30}"
+              + "".join(f"{table[d][page]:>10.4f}" for d in factors))
+
+
+if __name__ == "__main__":
+    main()